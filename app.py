@@ -0,0 +1,2144 @@
+import os
+import runpy
+import sys
+
+if __name__ == "__main__":
+    # Run directly: start through the main.py launcher, so the processes the audit
+    # spawns re-run its guard instead of this module and never open a window.
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), run_name="__main__")
+    sys.exit()
+
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog, filedialog, font as tkfont
+import datetime
+import threading
+import queue
+import time
+import difflib
+import csv
+import json
+import math
+import cProfile
+import functools
+import contextlib
+import collections
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from storage import (open_storage, empty_data, get_account_record, iter_accounts, apply_change, invert_change, encode_change, LazyAccounts,
+                     account_keys, resolve_raw, Service, FieldCipher, encrypt_data, is_encrypted, ExternalChange,
+                     ACCOUNT_SECRET_FIELDS, SERVICE_SECRET_FIELDS)
+from core import (default_data_file, ReuseIndex, REUSE_KINDS, FuzzyMatcher, GLOBAL_SEARCH_LIMIT, VaultError,
+                  new_account_change, update_account_changes, service_record, protect_secrets,
+                  transfer_format, read_rows, import_changes, export_services,
+                  remember_base, forget_bases, merge_data, install_data,
+                  BreachList, password_entropy, strength_label, init_audit_worker, audit_chunk, AUDIT_CHUNK,
+                  pretty_lines)
+
+# ---------------- Custom Dialog for Long Email Input ----------------
+class LongEntryDialog(simpledialog.Dialog):
+    def __init__(self, parent, title, prompt):
+        self.prompt = prompt
+        self.result = None
+        super().__init__(parent, title)
+
+    def body(self, master):
+        tk.Label(master, text=self.prompt).grid(row=0, sticky="w")
+        # Create an entry with width=40
+        self.entry = tk.Entry(master, width=40)
+        self.entry.grid(row=1, column=0)
+        return self.entry
+
+    def apply(self):
+        self.result = self.entry.get()
+
+def ask_string_long(title, prompt):
+    d = LongEntryDialog(root, title, prompt)
+    return d.result
+
+# ---------------- Instrumentation ----------------
+# With INSTRUMENT on, every @instrumented function and timing() section records
+# how long each call took. The Debug tab shows call counts and rolling latencies
+# over the last TIMING_WINDOW calls; the Debug menu runs cProfile over a stretch
+# of use (Tk thread only) and saves the timings as JSON.
+INSTRUMENT = True
+TIMING_WINDOW = 200
+DEBUG_REFRESH_MS = 1000
+
+class Timings:
+    def __init__(self):
+        self.lock = threading.Lock()      # The saver thread records too.
+        self.stats = {}                   # name -> [calls, total seconds, recent durations]
+
+    def add(self, name, seconds):
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, collections.deque(maxlen=TIMING_WINDOW)]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2].append(seconds)
+
+    def summary(self):
+        with self.lock:
+            stats = [(name, calls, total, sorted(recent)) for name, (calls, total, recent) in self.stats.items()]
+        return [{"name": name, "calls": calls, "total_ms": total * 1000,
+                 "mean_ms": sum(recent) / len(recent) * 1000,
+                 "p95_ms": recent[math.ceil(len(recent) * 0.95) - 1] * 1000,
+                 "max_ms": recent[-1] * 1000} for name, calls, total, recent in stats]
+
+timings = Timings()
+
+@contextlib.contextmanager
+def timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if INSTRUMENT:
+            timings.add(name, time.perf_counter() - start)
+
+def instrumented(func):
+    if not INSTRUMENT:
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with timing(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+# ---------------- Data Loading and Saving ----------------
+# Persistence lives in storage.py: data.json with its change journal, or an
+# SQLite database once one has been migrated (python storage.py migrate ...).
+# With FAST_START only the account keys are read before the window opens; the
+# accounts themselves load when first selected or from a background prefetch.
+# Without a usable fast-start index, STREAM_LOAD parses data.json account by
+# account once the window exists, filling the account list as records arrive.
+JOURNAL_COMPACT_INTERVAL_MS = 5 * 60 * 1000
+FAST_START = True
+PREFETCH_POLL_MS = 50
+STREAM_LOAD = True
+STREAM_UI_BATCH = 500
+storage = open_storage(default_data_file())
+load_failed = False        # The data file could not be read; nothing is saved until it is reloaded.
+
+@instrumented
+def load_data(store=None, lazy=False, **options):
+    global load_failed
+    store = store or storage
+    try:
+        data = store.load(lazy=lazy, **options)
+        for warning in store.warnings:
+            messagebox.showwarning("Recovered", warning)
+        if store is storage:
+            load_failed = False
+        return data
+    except Exception as e:
+        if store is storage:
+            load_failed = True
+        messagebox.showerror("Error", f"Error loading JSON file: {e}\n\n"
+                                      "Nothing will be saved until it is loaded again (File > Reload Data File).")
+        return empty_data()
+
+@instrumented
+def save_data(data, store=None, silent=False):
+    store = store or storage
+    if store is storage and load_failed:
+        messagebox.showerror("Error", f"{store.filename} was not loaded; nothing is saved until it is.")
+        return
+    try:
+        store.save(data)
+        if not silent:
+            messagebox.showinfo("Save Successful", f"Data saved to {store.filename}.")
+    except Exception as e:
+        messagebox.showerror("Error", f"Error saving JSON file: {e}")
+
+# ---------------- Background Persistence ----------------
+# CRUD handlers only apply the change to `data` and hand the journal line to the
+# saver thread. The worker waits SAVE_DEBOUNCE_MS after the first pending change
+# so a burst of edits lands in one append, and compacts the journal into a full
+# snapshot when asked to (timer, size threshold, Save All). Status goes back to
+# the Tk thread through a queue polled with root.after; Tk is never touched here.
+# When another process wrote the file first, the worker keeps its lines, stops
+# (`blocked`) and reports a conflict; sync_external() merges and lets it go on.
+SAVE_DEBOUNCE_MS = 500
+SAVE_STATUS_POLL_MS = 200
+data_lock = threading.RLock()   # Held by every mutation of `data` and by the snapshot encoder.
+
+class BackgroundSaver:
+    def __init__(self, store, debounce_ms=SAVE_DEBOUNCE_MS):
+        self.storage = store
+        self.debounce = debounce_ms / 1000.0
+        self.cond = threading.Condition()
+        self.pending = []
+        self.submitted = 0         # Changes submitted so far ...
+        self.written = 0           # ... and how many of them are on disk.
+        self.compact_requested = False
+        self.flush_requested = False
+        self.blocked = False
+        self.failed = False        # The last write failed; retried with the next change, compaction or flush.
+        self.read_only = False     # Set while the data file could not be loaded.
+        self.idle = False
+        self.last_error = None
+        self.status = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="saver", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, change):
+        self.submit_many([change])
+
+    def submit_many(self, changes):
+        # Handed over together, so the worker writes them in one append.
+        lines = [encode_change(change) for change in changes]
+        with self.cond:
+            self.pending.extend(lines)
+            self.submitted += len(lines)
+            self.failed = False
+            self.cond.notify_all()
+
+    def request_compaction(self):
+        with self.cond:
+            self.compact_requested = True
+            self.failed = False
+            self.cond.notify_all()
+
+    def flush(self, compact=False):
+        # Blocks until everything submitted so far is on disk, or until the worker
+        # stops at a conflict (then the error is an ExternalChange).
+        with self.cond:
+            self.compact_requested = self.compact_requested or compact
+            self.flush_requested = True
+            self.failed = False
+            self.cond.notify_all()
+            while not self.idle or not (self.blocked or self.failed or self.read_only) and (
+                    self.pending or self.compact_requested):
+                self.cond.wait()
+            self.flush_requested = False
+            if self.read_only:
+                return RuntimeError(f"{self.storage.filename} was not loaded; nothing is saved until it is.")
+            if self.blocked:
+                return ExternalChange(f"{self.storage.filename} was changed by another program.")
+            return self.last_error
+
+    def hold(self):
+        # Keeps the worker off the files until release(); a write in progress finishes first.
+        with self.cond:
+            self.blocked = True
+            self.cond.notify_all()
+            while not self.idle:
+                self.cond.wait()
+
+    def release(self):
+        with self.cond:
+            self.blocked = False
+            self.cond.notify_all()
+
+    def set_read_only(self, read_only):
+        with self.cond:
+            self.read_only = read_only
+            self.cond.notify_all()
+
+    def discard_pending(self):
+        # Everything submitted is in a snapshot written by someone else.
+        with self.cond:
+            self.pending = []
+            self.written = self.submitted
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.blocked or self.failed or self.read_only or not (self.pending or self.compact_requested):
+                    self.idle = True
+                    self.cond.notify_all()
+                    self.cond.wait()
+                self.idle = False
+                if not self.compact_requested:
+                    deadline = time.monotonic() + self.debounce
+                    while not self.flush_requested and not self.blocked and time.monotonic() < deadline:
+                        self.cond.wait(deadline - time.monotonic())
+                    if self.blocked:
+                        continue
+                compact, self.compact_requested = self.compact_requested, False
+            self.last_error = None
+            lines = []
+            try:
+                if not (compact and self.storage.snapshot_required):
+                    with self.cond:
+                        lines, self.pending, submitted = self.pending, [], self.submitted
+                    if lines:
+                        self.status.put(("saving", len(lines)))
+                        with timing("saver: journal append"):
+                            compact = self.storage.append(lines) or compact
+                        with self.cond:
+                            self.written = submitted
+                        lines = []
+                if compact:
+                    self.status.put(("saving", None))
+                    self.compact()
+                self.status.put(("saved", datetime.datetime.now().strftime("%H:%M:%S")))
+            except ExternalChange as e:
+                with self.cond:
+                    self.pending[:0] = lines
+                    self.blocked = True
+                self.status.put(("conflict", str(e)))
+            except Exception as e:
+                # Put unwritten lines back for the next attempt; a failed append may be retried.
+                with self.cond:
+                    self.pending[:0] = lines
+                    self.last_error = e
+                    self.failed = True
+                self.status.put(("error", str(e)))
+
+    def compact(self):
+        if not self.storage.snapshot_required:
+            with timing("saver: checkpoint"):
+                self.storage.checkpoint()
+            return
+        with data_lock, timing("saver: encode snapshot"):
+            raw, layout = self.storage.encode(data)
+            with self.cond:
+                # These changes are part of the snapshot being written.
+                self.pending = []
+                submitted = self.submitted
+        with timing("saver: write snapshot"):
+            self.storage.write_snapshot(raw, layout)
+        with self.cond:
+            self.written = submitted
+
+def record_change(change):
+    record_changes([change])
+
+def record_changes(changes, history=True):
+    # One batch for the saver, submitted under the same lock hold so a compaction
+    # cannot take the changes in between. remember_base also loads the account, so
+    # the index and invert_change see it before it changes. Returns the changes that
+    # undo the batch; with `history` they become one undo step.
+    inverses = []
+    load_accounts([key for change in changes for key in (change.get("account"), change.get("new")) if key])
+    with data_lock:
+        for change in changes:
+            remember_base(merge_bases, data, change, saver.submitted + len(changes))
+            inverses.append(invert_change(data, change))
+            service_index.apply_change(data, change)
+            apply_change(data, change)
+            mark_tree_dirty(change)
+            update_account_rows(change)
+        saver.submit_many(changes)
+    inverses.reverse()
+    if history:
+        undo_history.append(inverses)
+        redo_history.clear()
+        update_history_menu()
+    return inverses
+
+def compact_journal():
+    if storage.snapshot_required and storage.has_journal():
+        saver.request_compaction()
+    root.after(JOURNAL_COMPACT_INTERVAL_MS, compact_journal)
+
+def poll_save_status():
+    while True:
+        try:
+            kind, detail = saver.status.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "saving":
+            save_status_label.config(text="Saving...")
+        elif kind == "saved":
+            save_status_label.config(text=f"All changes saved ({detail})")
+            forget_bases(merge_bases, saver.written)
+        elif kind == "conflict":
+            sync_external()
+        else:
+            save_status_label.config(text="Save failed")
+            messagebox.showerror("Error", f"Error saving JSON file: {detail}")
+    root.after(SAVE_STATUS_POLL_MS, poll_save_status)
+
+def flush_saver(compact=False):
+    error = saver.flush(compact)
+    if isinstance(error, ExternalChange):
+        sync_external()
+        error = saver.flush(compact)
+    return error
+
+# ---------------- Sharing the Data File ----------------
+# Other instances (and cli.py) may write the same file. A watcher notices when
+# they did: if they only appended to the journal and we have nothing unsaved,
+# their changes are applied like our own; otherwise their copy is read in full
+# and merged with ours per account (core.merge_data), and the result is written
+# back. Either way only the accounts that changed are redrawn.
+WATCH_INTERVAL_MS = 1000
+merge_bases = {}           # See core.remember_base.
+
+def watch_data_file():
+    try:
+        changed = not saver.blocked and not load_failed and storage.changed_on_disk()
+    except OSError:
+        changed = False
+    if changed:
+        sync_external()
+    root.after(WATCH_INTERVAL_MS, watch_data_file)
+
+def install_change(change):
+    if change.get("account") in data.get("accounts", {}):
+        data["accounts"][change["account"]]
+    service_index.apply_change(data, change)
+    with data_lock:
+        apply_change(data, change)
+    mark_tree_dirty(change)
+    update_account_rows(change)
+
+@instrumented
+def sync_external():
+    saver.hold()
+    conflicts, changed = [], []
+    try:
+        with storage.file_lock:
+            changes = None if merge_bases or saver.pending else storage.read_new_changes()
+            if changes is not None:
+                for change in changes:
+                    install_change(change)
+                    changed.extend(key for key in (change.get("account"), change.get("new")) if key)
+            else:
+                theirs = storage.read_external()
+                merged, conflicts = merge_data(merge_bases, data, theirs)
+                with data_lock:
+                    changed = install_data(data, merged, service_index)
+                    if merge_bases or saver.pending:
+                        storage.save(data, force=True)
+                        saver.discard_pending()
+                    else:
+                        storage.adopt()
+                for account_key in changed:
+                    mark_tree_dirty({"op": "put_account", "account": account_key})
+                merge_bases.clear()
+    except Exception as e:
+        messagebox.showerror("Error", f"Error reading changes made by another program: {e}")
+        return
+    finally:
+        saver.release()
+    if not changed:
+        return
+    # Positions in the undo steps may no longer match.
+    clear_history()
+    refresh_account_list()
+    refresh_main_tree()
+    refresh_selected_account(changed)
+    save_status_label.config(text="Reloaded changes from another program")
+    if conflicts:
+        messagebox.showwarning("Merged Changes", "Both this window and another program changed the data:\n\n"
+                               + "\n".join(conflicts))
+
+def load_accounts(keys):
+    # Loads the accounts a fast start left on disk before they are used. Once another
+    # program has replaced the file their spans are stale (ExternalChange); its copy
+    # is taken in instead, which loads every account.
+    accounts = data.get("accounts")
+    if not isinstance(accounts, LazyAccounts):
+        return
+    try:
+        with data_lock:
+            for key in keys:
+                if key in accounts and not accounts.is_loaded(key):
+                    accounts[key]
+    except ExternalChange:
+        sync_external()
+
+# ---------------- Background Prefetch ----------------
+# After a fast start, a worker thread reads the remaining accounts from storage
+# and the Tk thread installs them a batch at a time, which also indexes them.
+prefetched = queue.Queue()
+
+def prefetch_accounts(keys):
+    for key in keys:
+        try:
+            prefetched.put((key, storage.load_account(key)))
+        except Exception:
+            # Left for an on-demand load, which reports the error where it is used.
+            continue
+    prefetched.put(None)
+
+def start_prefetch():
+    accounts = data.get("accounts")
+    if not isinstance(accounts, LazyAccounts) or not accounts.unloaded_keys():
+        return
+    threading.Thread(target=prefetch_accounts, args=(accounts.unloaded_keys(),), name="prefetch", daemon=True).start()
+    root.after(PREFETCH_POLL_MS, poll_prefetch)
+
+def poll_prefetch():
+    deadline = time.monotonic() + PREFETCH_POLL_MS / 1000.0
+    while time.monotonic() < deadline:
+        try:
+            item = prefetched.get_nowait()
+        except queue.Empty:
+            break
+        if item is None:
+            return
+        data["accounts"].install(*item)
+    root.after(PREFETCH_POLL_MS, poll_prefetch)
+
+# ---------------- Field Encryption ----------------
+# Secrets stay encrypted in `data`; they are decrypted only when a form shows them
+# and re-encrypted only when the form value differs from what is stored.
+field_cipher = None        # Set once the passphrase has been entered this session.
+
+def reveal(value):
+    if field_cipher is None or not is_encrypted(value):
+        return value
+    try:
+        return field_cipher.decrypt(value)
+    except ValueError:
+        return value
+
+def protect_fields(values, previous, fields):
+    # Replaces the secret fields of `values` with what should be stored. Returns
+    # False when the vault is locked and one of them was changed.
+    try:
+        protect_secrets(data, field_cipher, values, previous, fields)
+    except VaultError as e:
+        messagebox.showwarning("Locked", str(e))
+        return False
+    return True
+
+def ask_passphrase(title, prompt):
+    return simpledialog.askstring(title, prompt, show="*", parent=root)
+
+def unlock_vault():
+    global field_cipher
+    if "encryption" not in data or field_cipher is not None:
+        return
+    for attempt in range(3):
+        passphrase = ask_passphrase("Unlock", "Passphrase for the encrypted passwords:")
+        if passphrase is None:
+            break
+        try:
+            field_cipher = FieldCipher.unlock(passphrase, data["encryption"])
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        except ValueError:
+            messagebox.showwarning("Unlock", "Wrong passphrase.")
+            continue
+        service_index.rebucket()
+        refresh_main_tree(full=True)
+        return
+    messagebox.showwarning("Locked", "Encrypted passwords stay hidden until they are unlocked.")
+
+def encrypt_passwords():
+    global field_cipher
+    if "encryption" in data:
+        if field_cipher is None:
+            unlock_vault()
+        else:
+            messagebox.showinfo("Encryption", "Passwords are already encrypted.")
+        return
+    passphrase = ask_passphrase("Encrypt Passwords", "New passphrase:")
+    if not passphrase:
+        return
+    if ask_passphrase("Encrypt Passwords", "Repeat the passphrase:") != passphrase:
+        messagebox.showwarning("Input Error", "The passphrases do not match.")
+        return
+    try:
+        cipher, settings = FieldCipher.create(passphrase)
+    except RuntimeError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    flush_saver()
+    if storage.changed_on_disk():
+        sync_external()
+    with data_lock:
+        count = encrypt_data(data, cipher)
+        data["encryption"] = settings
+    field_cipher = cipher
+    # The undo steps still hold the plaintext values.
+    clear_history()
+    save_data(data, silent=True)
+    refresh_main_tree(full=True)
+    message = f"Encrypted {count} passwords and PINs."
+    if storage.snapshot_required:
+        message += f" Older backups of {storage.filename} still contain them in plain text."
+    messagebox.showinfo("Encryption", message)
+
+# ---------------- Streaming Load ----------------
+@instrumented
+def stream_load():
+    # Runs before mainloop; only redraws are processed in between batches, so no
+    # event handler ever sees a half-loaded `data`.
+    loaded = 0
+
+    def on_account(key, account):
+        nonlocal loaded
+        service_index.add_account(key, account)
+        if key != "OTHERS":
+            accounts_listbox.insert(tk.END, key)
+        loaded += 1
+        if loaded % STREAM_UI_BATCH == 0:
+            save_status_label.config(text=f"Loading... {loaded} accounts")
+            root.update_idletasks()
+
+    save_status_label.config(text="Loading...")
+    root.update_idletasks()
+    loaded_data = load_data(stream=True, on_account=on_account, before_change=service_index.apply_change)
+    data.clear()
+    data.update(loaded_data)
+    saver.set_read_only(load_failed)
+    if not getattr(storage, "streamed", False) or not data.get("accounts"):
+        service_index.rebuild(data)
+    save_status_label.config(text="")
+    refresh_account_list()
+    refresh_main_tree(full=True)
+
+# ---------------- Global Data and Variables ----------------
+stream_pending = STREAM_LOAD and not (FAST_START and storage.can_load_lazily())
+data = empty_data() if stream_pending else load_data(lazy=FAST_START)
+saver = BackgroundSaver(storage)
+saver.set_read_only(load_failed)
+saver.start()
+# Also tracks reused secrets and duplicate services for the Reuse tab.
+service_index = ReuseIndex(reveal)
+service_index.rebuild(data)
+if isinstance(data.get("accounts"), LazyAccounts):
+    data["accounts"].on_load = service_index.add_account
+service_matcher = FuzzyMatcher(service_index)
+selected_account_email = None
+selected_service_index = None
+edit_mode = False          # When True, account details fields are editable.
+original_account = {}      # To store original values for comparison.
+# Global list to map filtered service list indices to the actual service indices
+filtered_service_indices = []
+# Account of each filtered row; differs from the selected account in global search mode.
+filtered_service_accounts = []
+
+# ---------------- Main Window and Notebook ----------------
+root = tk.Tk()
+root.title("Account & Service Management")
+root.geometry("1200x950")
+
+main_notebook = ttk.Notebook(root)
+main_notebook.pack(fill="both", expand=True, padx=10, pady=10)
+
+# ---------------- Main Tab (Treeview) ----------------
+main_tab = tk.Frame(main_notebook)
+main_notebook.add(main_tab, text="Main")
+
+main_tree_scroll = tk.Scrollbar(main_tab)
+main_tree_scroll.pack(side="right", fill="y")
+
+main_tree = ttk.Treeview(main_tab, yscrollcommand=main_tree_scroll.set)
+main_tree_scroll.config(command=main_tree.yview)
+main_tree["columns"] = ("Details",)
+main_tree.column("#0", width=300, minwidth=150, stretch=tk.YES)
+main_tree.column("Details", width=600, minwidth=150, stretch=tk.YES)
+main_tree.heading("#0", text="Key/Name", anchor=tk.W)
+main_tree.heading("Details", text="Value", anchor=tk.W)
+main_tree.pack(fill="both", expand=True)
+
+# Nodes are created closed with a single placeholder child so Tk still draws the
+# expand arrow; the real children are inserted on <<TreeviewOpen>>. Service lists
+# are inserted TREE_PAGE_SIZE at a time with a "more" node for the rest.
+TREE_PAGE_SIZE = 200
+lazy_tree_nodes = {}       # tree item -> function that fills in its children.
+
+def insert_lazy_node(parent, text, populate, tree_widget, values=()):
+    node = tree_widget.insert(parent, "end", text=text, values=values, open=False)
+    tree_widget.insert(node, "end", text="Loading...")
+    lazy_tree_nodes[node] = populate
+    return node
+
+def populate_tree_node(node, tree_widget):
+    populate = lazy_tree_nodes.pop(node, None)
+    if populate is None:
+        return
+    tree_widget.delete(*tree_widget.get_children(node))
+    populate(node)
+
+@instrumented
+def on_main_tree_open(event):
+    node = main_tree.focus()
+    if not main_tree.parent(node):
+        load_accounts([main_tree.item(node, "text")])
+    populate_tree_node(node, main_tree)
+
+def insert_account_tree(account_email, account_data, tree_widget):
+    # account_data=None looks the account up on expand, so unopened accounts are never loaded.
+    return insert_lazy_node("", account_email, lambda node: insert_account_children(
+        node, account_data if account_data is not None else get_account_record(data, account_email), tree_widget), tree_widget)
+
+def insert_account_children(account_node, account_data, tree_widget):
+    tree_widget.insert(account_node, "end", text="sign_in_with", values=(account_data.get("sign_in_with", ""),), open=False)
+    services = account_data.get("services", [])
+    insert_lazy_node(account_node, "services", lambda node: insert_services_page(node, services, 0, tree_widget), tree_widget)
+
+def insert_services_page(services_branch, services, start, tree_widget):
+    for service in services[start:start + TREE_PAGE_SIZE]:
+        insert_lazy_node(services_branch, service.get("name", "Unnamed Service"),
+                         lambda node, service=service: insert_service_children(node, service, tree_widget), tree_widget)
+    remaining = len(services) - start - TREE_PAGE_SIZE
+    if remaining > 0:
+        insert_lazy_node(services_branch, f"... {remaining} more services",
+                         lambda node: load_more_services(node, services, start + TREE_PAGE_SIZE, tree_widget), tree_widget)
+
+def load_more_services(more_node, services, start, tree_widget):
+    services_branch = tree_widget.parent(more_node)
+    tree_widget.delete(more_node)
+    insert_services_page(services_branch, services, start, tree_widget)
+
+def insert_service_children(service_node, service, tree_widget):
+    for key, value in service.items():
+        if key == "name":
+            continue
+        insert_tree_item(service_node, key, value, tree_widget)
+
+def insert_tree_item(parent, key, value, tree_widget):
+    value = resolve_raw(value)
+    if isinstance(value, (dict, Service)):
+        insert_lazy_node(parent, key, lambda node: [insert_tree_item(node, subkey, subvalue, tree_widget)
+                                                   for subkey, subvalue in value.items()], tree_widget)
+    elif isinstance(value, list):
+        def populate(node):
+            for idx, item in enumerate(value):
+                display_key = item["name"] if isinstance(item, (dict, Service)) and "name" in item else f"[{idx}]"
+                insert_tree_item(node, display_key, item, tree_widget)
+        insert_lazy_node(parent, key, populate, tree_widget)
+    else:
+        tree_widget.insert(parent, "end", text=key, values=("(encrypted)" if is_encrypted(value) else value,), open=False)
+
+def insert_others_tree(others_data, tree_widget):
+    others_node = tree_widget.insert("", "end", text="OTHERS", open=False)
+    for key, value in others_data.items():
+        insert_tree_item(others_node, key, value, tree_widget)
+
+# After the first render only the accounts touched since the last refresh are
+# patched. Their open nodes are re-expanded by path and the scroll position is
+# kept, so a save after one edit costs a handful of Treeview calls.
+account_tree_nodes = {}    # account key -> top-level tree item.
+dirty_tree_accounts = set()
+
+def mark_tree_dirty(change):
+    dirty_tree_accounts.add(change.get("account"))
+    if change["op"] == "rename_account":
+        dirty_tree_accounts.add(change["new"])
+        if change["account"] in account_tree_nodes:
+            account_tree_nodes[change["new"]] = account_tree_nodes.pop(change["account"])
+
+def forget_tree_items(item, tree_widget):
+    for child in tree_widget.get_children(item):
+        forget_tree_items(child, tree_widget)
+    lazy_tree_nodes.pop(item, None)
+
+def expanded_paths(item, tree_widget, prefix=()):
+    paths = []
+    if item in lazy_tree_nodes:
+        return paths
+    for child in tree_widget.get_children(item):
+        if tree_widget.item(child, "open"):
+            path = prefix + (tree_widget.item(child, "text"),)
+            paths.append(path)
+            paths.extend(expanded_paths(child, tree_widget, path))
+    return paths
+
+def reopen_paths(item, paths, tree_widget):
+    for path in paths:
+        node = item
+        for text in path:
+            populate_tree_node(node, tree_widget)
+            node = next((child for child in tree_widget.get_children(node)
+                         if tree_widget.item(child, "text") == text), None)
+            if node is None:
+                break
+        else:
+            populate_tree_node(node, tree_widget)
+            tree_widget.item(node, open=True)
+
+def refresh_account_tree(account_key, tree_widget):
+    if account_key == "OTHERS":
+        account = data.get("OTHERS")
+    else:
+        account = data.get("accounts", {}).get(account_key)
+    node = account_tree_nodes.get(account_key)
+    if account is None:
+        if node is not None:
+            forget_tree_items(node, tree_widget)
+            tree_widget.delete(node)
+            del account_tree_nodes[account_key]
+        return
+    if node is None:
+        account_tree_nodes[account_key] = insert_account_tree(account_key, account, tree_widget)
+        return
+    was_open = tree_widget.item(node, "open")
+    paths = expanded_paths(node, tree_widget)
+    for child in tree_widget.get_children(node):
+        forget_tree_items(child, tree_widget)
+    tree_widget.delete(*tree_widget.get_children(node))
+    tree_widget.item(node, text=account_key)
+    tree_widget.insert(node, "end", text="Loading...")
+    lazy_tree_nodes[node] = lambda n: insert_account_children(n, account, tree_widget)
+    if was_open:
+        populate_tree_node(node, tree_widget)
+        reopen_paths(node, paths, tree_widget)
+
+@instrumented
+def refresh_main_tree(full=False):
+    if full or not account_tree_nodes:
+        main_tree.delete(*main_tree.get_children())
+        lazy_tree_nodes.clear()
+        account_tree_nodes.clear()
+        dirty_tree_accounts.clear()
+        for email in data.get("accounts", {}):
+            account_tree_nodes[email] = insert_account_tree(email, None, main_tree)
+        if "OTHERS" in data:
+            account_tree_nodes["OTHERS"] = insert_account_tree("OTHERS", data["OTHERS"], main_tree)
+        return
+    if not dirty_tree_accounts:
+        return
+    first_visible = main_tree.yview()[0]
+    dirty = set(dirty_tree_accounts)
+    dirty_tree_accounts.clear()
+    for account_key in dirty:
+        refresh_account_tree(account_key, main_tree)
+    # Untouched accounts never change relative order, so placing the dirty ones at
+    # their index in `data` is enough to match it.
+    expected = list(data.get("accounts", {}))
+    if "OTHERS" in data:
+        expected.append("OTHERS")
+    current = list(main_tree.get_children())
+    for idx, account_key in enumerate(expected):
+        if account_key not in dirty:
+            continue
+        node = account_tree_nodes[account_key]
+        if current[idx] != node:
+            main_tree.move(node, "", idx)
+            current.remove(node)
+            current.insert(idx, node)
+    main_tree.yview_moveto(first_visible)
+
+main_tree.bind("<<TreeviewOpen>>", on_main_tree_open)
+refresh_main_tree()
+
+# ---------------- Virtual List ----------------
+# A Listbox that shows a window onto `rows` instead of holding every row: only the
+# lines on screen exist as Tk items, the scrollbar spans the whole sequence, and
+# insert/replace/delete touch just the lines they affect on screen. Selection,
+# get() and size() use positions in `rows`, so handlers use it like a Listbox.
+SYNC_DIFF_LIMIT = 5000         # Past this many changed rows, replace the block instead of diffing.
+
+def sync_listbox(listbox, current, new):
+    start, limit = 0, min(len(current), len(new))
+    while start < limit and current[start] == new[start]:
+        start += 1
+    end_current, end_new = len(current), len(new)
+    while end_current > start and end_new > start and current[end_current - 1] == new[end_new - 1]:
+        end_current -= 1
+        end_new -= 1
+    if end_current - start > SYNC_DIFF_LIMIT or end_new - start > SYNC_DIFF_LIMIT:
+        opcodes = [("replace", start, end_current, start, end_new)]
+    else:
+        matcher = difflib.SequenceMatcher(None, current[start:end_current], new[start:end_new], autojunk=False)
+        opcodes = [(tag, i1 + start, i2 + start, j1 + start, j2 + start) for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    # Apply from the bottom up so earlier row numbers stay valid.
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if tag in ("replace", "delete") and i2 > i1:
+            listbox.delete(i1, i2 - 1)
+        if tag in ("replace", "insert") and j2 > j1:
+            listbox.insert(i1, *new[j1:j2])
+    current[:] = new
+
+class VirtualListbox(tk.Frame):
+    def __init__(self, master, height=10, **options):
+        super().__init__(master)
+        self.rows = []
+        self.top = 0               # Position in `rows` of the first line shown.
+        self.lines = height        # Lines that fit; follows the widget size.
+        self.shown = []            # Labels the Tk listbox holds right now.
+        self.selected = None
+        self.listbox = tk.Listbox(self, height=height, exportselection=False, **options)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.line_height = (tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+                            + 2 * int(self.listbox.cget("selectborderwidth") or 0))
+        # Our selection tracking is bound to a tag of its own that runs ahead of the
+        # listbox's, so callers bind and rebind handlers exactly as on a Listbox.
+        tracking = f"VirtualListbox{id(self)}"
+        self.listbox.bind_class(tracking, "<<ListboxSelect>>", self.on_select)
+        self.listbox.bindtags((tracking,) + self.listbox.bindtags())
+        self.listbox.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.listbox.bind(sequence, self.on_wheel)
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                               ("<Home>", "home"), ("<End>", "end")):
+            self.listbox.bind(sequence, lambda event, step=step: self.move(step))
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.listbox.bind(sequence, func, add)
+
+    # ----- Listbox interface -----
+    def size(self):
+        return len(self.rows)
+
+    def get(self, first, last=None):
+        if last is None:
+            return self.rows[first]
+        return tuple(self.rows[first:None if last == tk.END else last + 1])
+
+    def index_of(self, row):
+        try:
+            return self.rows.index(row)
+        except ValueError:
+            return None
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def selection_clear(self, first=0, last=None):
+        self.selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def selection_set(self, index, last=None):
+        self.selected = index
+        self.render()
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.lines:
+            self.top = index - self.lines + 1
+        self.render()
+
+    def insert(self, index, *rows):
+        index = len(self.rows) if index == tk.END else index
+        self.rows[index:index] = rows
+        if self.selected is not None and self.selected >= index:
+            self.selected += len(rows)
+        self.changed(index)
+
+    def delete(self, first, last=None):
+        last = first if last is None else len(self.rows) - 1 if last == tk.END else last
+        del self.rows[first:last + 1]
+        if self.selected is not None and self.selected >= first:
+            self.selected = None if self.selected <= last else self.selected - (last - first + 1)
+        self.changed(first)
+
+    def replace(self, index, row):
+        self.rows[index] = row
+        self.changed(index)
+
+    def set_rows(self, rows):
+        # A selection survives when its row is still at the same position.
+        if self.selected is not None and (self.selected >= len(rows) or rows[self.selected] != self.rows[self.selected]):
+            self.selected = None
+        self.rows = list(rows)
+        self.render()
+
+    # ----- Window -----
+    def changed(self, index):
+        if index < self.top + self.lines:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def render(self):
+        self.top = max(0, min(self.top, len(self.rows) - self.lines))
+        window = self.rows[self.top:self.top + self.lines + 1]    # One more for a partly visible line.
+        sync_listbox(self.listbox, self.shown, [str(row) for row in window])
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected is not None and self.top <= self.selected < self.top + len(window):
+            self.listbox.selection_set(self.selected - self.top)
+        self.listbox.yview_moveto(0)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.rows)
+        if total <= self.lines:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / total, (self.top + self.lines) / total)
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            self.top += int(args[1]) * (self.lines if args[2] == "pages" else 1)
+        self.render()
+
+    def on_resize(self, event):
+        lines = max(1, event.height // self.line_height)
+        if lines != self.lines:
+            self.lines = lines
+            self.render()
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+        return "break"
+
+    def on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+
+    def move(self, step):
+        # Keyboard navigation over the whole sequence, not just the lines on screen.
+        if not self.rows:
+            return "break"
+        current = self.selected if self.selected is not None else self.top - 1
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = len(self.rows) - 1
+        else:
+            target = current + {"page": self.lines, "-page": -self.lines}.get(step, step)
+        self.selected = max(0, min(target, len(self.rows) - 1))
+        self.see(self.selected)
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
+
+# ---------------- CRUD Tab (Form-Based Interface) ----------------
+crud_tab = tk.Frame(main_notebook)
+main_notebook.add(crud_tab, text="CRUD")
+
+crud_left = tk.Frame(crud_tab)
+crud_left.pack(side="left", fill="y", padx=10, pady=10)
+tk.Label(crud_left, text="Accounts", font=("Helvetica", 12, "bold")).pack(pady=5)
+accounts_listbox = VirtualListbox(crud_left, width=40, height=30, font=("Helvetica", 11))
+accounts_listbox.pack(padx=5, pady=5, fill="both", expand=True)
+
+crud_right = tk.Frame(crud_tab)
+crud_right.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+selected_account_label_crud = tk.Label(crud_right, text="Selected Account: None", font=("Helvetica", 16, "bold"))
+selected_account_label_crud.pack(anchor="nw", padx=5, pady=5)
+crud_notebook = ttk.Notebook(crud_right)
+crud_notebook.pack(fill="both", expand=True, padx=5, pady=5)
+
+# ----- Account Details Sub-Tab -----
+account_frame_crud = ttk.Frame(crud_notebook)
+crud_notebook.add(account_frame_crud, text="Account Details")
+
+# Email
+tk.Label(account_frame_crud, text="Email:", font=("Helvetica", 11)).grid(row=0, column=0, sticky="e", padx=5, pady=5)
+email_entry = tk.Entry(account_frame_crud, width=60, font=("Helvetica", 11), state="disabled")
+email_entry.grid(row=0, column=1, padx=5, pady=5)
+
+# Password
+tk.Label(account_frame_crud, text="Password:", font=("Helvetica", 11)).grid(row=1, column=0, sticky="e", padx=5, pady=5)
+acc_password_entry = tk.Entry(account_frame_crud, width=60, font=("Helvetica", 11), state="disabled")
+acc_password_entry.grid(row=1, column=1, padx=5, pady=5)
+def toggle_password_edit():
+    if acc_password_entry.cget("state") == "disabled":
+        acc_password_entry.config(state="normal")
+        edit_password_btn.config(text="Lock")
+        update_acc_btn.config(bg="yellow")
+    else:
+        acc_password_entry.config(state="disabled")
+        edit_password_btn.config(text="Edit")
+        update_acc_btn.config(bg=default_update_bg)
+edit_password_btn = tk.Button(account_frame_crud, text="Edit", command=toggle_password_edit, font=("Helvetica", 11))
+edit_password_btn.grid(row=1, column=2, padx=5, pady=5)
+
+# Date Created
+tk.Label(account_frame_crud, text="Date Created:", font=("Helvetica", 11)).grid(row=2, column=0, sticky="e", padx=5, pady=5)
+acc_date_entry = tk.Entry(account_frame_crud, width=60, font=("Helvetica", 11), state="disabled")
+acc_date_entry.grid(row=2, column=1, padx=5, pady=5)
+
+# Phone(s)
+tk.Label(account_frame_crud, text="Phone(s):", font=("Helvetica", 11)).grid(row=3, column=0, sticky="e", padx=5, pady=5)
+phone_entry = tk.Entry(account_frame_crud, width=60, font=("Helvetica", 11), state="disabled")
+phone_entry.grid(row=3, column=1, padx=5, pady=5)
+
+# Account Buttons and Edit All
+acc_button_frame_crud = tk.Frame(account_frame_crud)
+acc_button_frame_crud.grid(row=4, column=1, pady=10)
+
+# ---- Updated New Account Function using Custom Dialog ----
+def new_account():
+    global selected_account_email
+    new_email = ask_string_long("New Account", "Enter new email:")
+    if not new_email:
+        return
+    try:
+        change = new_account_change(data, new_email)
+    except VaultError as e:
+        messagebox.showwarning("Input Error", str(e))
+        return
+    new_email = change["account"]
+    record_change(change)
+    selected_account_email = new_email
+    selected_account_label_crud.config(text="Selected Account: " + new_email)
+    refresh_services_list()
+    update_account_buttons()
+
+new_acc_btn = tk.Button(acc_button_frame_crud, text="New Account", command=new_account, font=("Helvetica", 11))
+new_acc_btn.pack(side="left", padx=5)
+add_svc_btn = tk.Button(acc_button_frame_crud, text="Add Service", command=lambda: add_service(), font=("Helvetica", 11))
+add_svc_btn.pack(side="left", padx=5)
+update_acc_btn = tk.Button(acc_button_frame_crud, text="Update Account", command=lambda: update_account(), font=("Helvetica", 11))
+update_acc_btn.pack(side="left", padx=5)
+delete_acc_btn = tk.Button(acc_button_frame_crud, text="Delete Account", command=lambda: delete_account(), font=("Helvetica", 11))
+delete_acc_btn.pack(side="left", padx=5)
+default_update_bg = update_acc_btn.cget("bg")
+def toggle_edit_mode():
+    global edit_mode, original_account
+    if selected_account_email == "OTHERS":
+        messagebox.showinfo("Info", "The OTHERS account cannot edit the email field.")
+    if not edit_mode:
+        edit_mode = True
+        original_account = {
+            "email": email_entry.get(),
+            "password": acc_password_entry.get(),
+            "dateCreated": acc_date_entry.get(),
+            "phone": phone_entry.get()
+        }
+        if selected_account_email != "OTHERS":
+            email_entry.config(state="normal")
+        phone_entry.config(state="normal")
+        acc_date_entry.config(state="normal")
+        acc_password_entry.config(state="normal")
+        update_acc_btn.config(bg="yellow")
+        edit_all_btn.config(text="Cancel Edit")
+    else:
+        edit_mode = False
+        if selected_account_email != "OTHERS":
+            email_entry.config(state="normal")
+            email_entry.delete(0, tk.END)
+            email_entry.insert(0, original_account.get("email", ""))
+            email_entry.config(state="disabled")
+        phone_entry.config(state="normal")
+        phone_entry.delete(0, tk.END)
+        phone_entry.insert(0, original_account.get("phone", ""))
+        phone_entry.config(state="disabled")
+        acc_date_entry.config(state="normal")
+        acc_date_entry.delete(0, tk.END)
+        acc_date_entry.insert(0, original_account.get("dateCreated", ""))
+        acc_date_entry.config(state="disabled")
+        acc_password_entry.config(state="normal")
+        acc_password_entry.delete(0, tk.END)
+        acc_password_entry.insert(0, original_account.get("password", ""))
+        acc_password_entry.config(state="disabled")
+        update_acc_btn.config(bg=default_update_bg)
+        edit_all_btn.config(text="Edit All")
+edit_all_btn = tk.Button(acc_button_frame_crud, text="Edit All", command=toggle_edit_mode, font=("Helvetica", 11))
+edit_all_btn.pack(side="left", padx=5)
+
+# ----- Service Details Sub-Tab -----
+service_frame_crud = ttk.Frame(crud_notebook)
+crud_notebook.add(service_frame_crud, text="Service Details")
+
+tk.Label(service_frame_crud, text="Service Name:", font=("Helvetica", 11)).grid(row=0, column=0, sticky="e", padx=5, pady=5)
+sname_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+sname_entry.grid(row=0, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Username:", font=("Helvetica", 11)).grid(row=1, column=0, sticky="e", padx=5, pady=5)
+susername_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+susername_entry.grid(row=1, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Email:", font=("Helvetica", 11)).grid(row=2, column=0, sticky="e", padx=5, pady=5)
+semail_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+semail_entry.grid(row=2, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Link:", font=("Helvetica", 11)).grid(row=3, column=0, sticky="e", padx=5, pady=5)
+slink_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+slink_entry.grid(row=3, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Webpage:", font=("Helvetica", 11)).grid(row=4, column=0, sticky="e", padx=5, pady=5)
+swebpage_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+swebpage_entry.grid(row=4, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="URL:", font=("Helvetica", 11)).grid(row=5, column=0, sticky="e", padx=5, pady=5)
+surl_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+surl_entry.grid(row=5, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Password:", font=("Helvetica", 11)).grid(row=6, column=0, sticky="e", padx=5, pady=5)
+spassword_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+spassword_entry.grid(row=6, column=1, padx=5, pady=5)
+spassword_audit_label = tk.Label(service_frame_crud, text="", font=("Helvetica", 10))
+spassword_audit_label.grid(row=6, column=2, sticky="w", padx=5)
+
+tk.Label(service_frame_crud, text="PIN:", font=("Helvetica", 11)).grid(row=7, column=0, sticky="e", padx=5, pady=5)
+spin_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+spin_entry.grid(row=7, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Phone:", font=("Helvetica", 11)).grid(row=8, column=0, sticky="e", padx=5, pady=5)
+sphone_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+sphone_entry.grid(row=8, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Date Created:", font=("Helvetica", 11)).grid(row=9, column=0, sticky="e", padx=5, pady=5)
+sdate_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+sdate_entry.grid(row=9, column=1, padx=5, pady=5)
+
+# New: Sign In With field for the service details
+tk.Label(service_frame_crud, text="Sign In With:", font=("Helvetica", 11)).grid(row=10, column=0, sticky="e", padx=5, pady=5)
+sign_in_with_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+sign_in_with_entry.grid(row=10, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Note:", font=("Helvetica", 11)).grid(row=11, column=0, sticky="e", padx=5, pady=5)
+snote_entry = tk.Entry(service_frame_crud, width=60, font=("Helvetica", 11))
+snote_entry.grid(row=11, column=1, padx=5, pady=5)
+
+tk.Label(service_frame_crud, text="Details (JSON):", font=("Helvetica", 11)).grid(row=12, column=0, sticky="ne", padx=5, pady=5)
+sdetails_text = tk.Text(service_frame_crud, width=60, height=8, font=("Helvetica", 11))
+sdetails_text.grid(row=12, column=1, padx=5, pady=5)
+
+# Large details are shown DETAILS_PAGE_LINES lines at a time with a "show more"
+# link after them. While the text is what was rendered, saving the form keeps the
+# stored details as they are instead of parsing the display text back.
+DETAILS_PAGE_LINES = 400
+SHOW_MORE = "[show more]"
+details_view = None        # {"value", "lines", "text", "more"} for the details on display.
+sdetails_text.tag_configure("more", foreground="blue", underline=True)
+
+def show_details(value):
+    global details_view
+    sdetails_text.delete("1.0", tk.END)
+    details = resolve_raw(value)
+    if not isinstance(details, dict):
+        details_view = None
+        sdetails_text.insert(tk.END, details)
+        return
+    details_view = {"value": value, "lines": pretty_lines(details), "text": "", "more": False}
+    show_more_details()
+
+def show_more_details(event=None):
+    view = details_view
+    if view is None:
+        return "break"
+    if view["more"]:
+        sdetails_text.delete("more.first", "more.last")
+    chunk = list(itertools.islice(view["lines"], DETAILS_PAGE_LINES + 1))
+    view["more"] = len(chunk) > DETAILS_PAGE_LINES
+    if view["more"]:
+        # The extra line goes back in front of the rest.
+        view["lines"] = itertools.chain(chunk[-1:], view["lines"])
+        chunk = chunk[:-1]
+    text = "".join(line + "\n" for line in chunk)
+    sdetails_text.insert(tk.END, text)
+    view["text"] += text
+    if view["more"]:
+        sdetails_text.insert(tk.END, SHOW_MORE, "more")
+    return "break"
+
+def details_from_form():
+    # The stored details when the display is untouched; otherwise the parsed text,
+    # or None when a partly shown payload was edited.
+    text = sdetails_text.get("1.0", tk.END)[:-1]
+    if details_view is not None and text == details_view["text"] + (SHOW_MORE if details_view["more"] else ""):
+        return details_view["value"]
+    if details_view is not None and details_view["more"]:
+        messagebox.showwarning("Input Error", "The details are only partly shown. Click \"show more\" until "
+                                              "all of them are shown before editing them.")
+        return None
+    return text
+
+sdetails_text.tag_bind("more", "<Button-1>", show_more_details)
+
+# ---- Service List & Search Area ----
+service_list_frame = tk.Frame(service_frame_crud)
+service_list_frame.grid(row=13, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+
+# Left side: Search frame with a label and a combobox for autosuggest.
+search_frame = tk.Frame(service_list_frame)
+search_frame.grid(row=0, column=0, sticky="nw", padx=5, pady=5)
+tk.Label(search_frame, text="Search:", font=("Helvetica", 11)).pack(anchor="w")
+search_combobox = ttk.Combobox(search_frame, width=30)
+search_combobox.pack(anchor="w", pady=2)
+search_all_var = tk.BooleanVar(value=False)
+search_all_check = tk.Checkbutton(search_frame, text="All accounts", variable=search_all_var,
+                                  command=lambda: refresh_services_list(), font=("Helvetica", 10))
+search_all_check.pack(anchor="w")
+
+# Right side: Output box (the services list)
+list_frame = tk.Frame(service_list_frame)
+list_frame.grid(row=0, column=1, sticky="nw", padx=5, pady=5)
+tk.Label(list_frame, text="Services List:", font=("Helvetica", 11)).pack(anchor="w")
+services_listbox = VirtualListbox(list_frame, width=55, height=8, font=("Helvetica", 11))
+services_listbox.pack(anchor="w", pady=2)
+
+# --- Search Pipeline ---
+# Keystrokes only bump search_generation and (re)arm a SEARCH_DEBOUNCE_MS timer;
+# a run whose generation is no longer current is dropped. Each run computes the
+# matching rows once and the listbox is patched against the rows it already
+# shows, so typing one more character usually deletes a few rows instead of
+# clearing and refilling the whole list.
+SEARCH_DEBOUNCE_MS = 150
+search_generation = 0
+search_after_id = None
+
+def service_rows(text, exact=False, found=None):
+    search_all = search_all_var.get()
+    if search_all:
+        matches = service_index.matches(text, found=found)
+    elif selected_account_email is None:
+        return [], [], []
+    else:
+        matches = service_index.matches(text, selected_account_email, found)
+    labels, indices, accounts = [], [], []
+    for account_key, i in matches:
+        svc_name = get_account_record(data, account_key)["services"][i].get("name", "")
+        if exact and svc_name.lower() != text.lower():
+            continue
+        if search_all and len(indices) >= GLOBAL_SEARCH_LIMIT:
+            labels.append(f"... more than {GLOBAL_SEARCH_LIMIT} matches, refine the search")
+            break
+        labels.append(f"{account_key} > {svc_name}" if search_all else svc_name)
+        indices.append(i)
+        accounts.append(account_key)
+    return labels, indices, accounts
+
+def show_service_rows(labels, indices, accounts):
+    global filtered_service_indices, filtered_service_accounts
+    services_listbox.set_rows(labels)
+    filtered_service_indices = indices
+    filtered_service_accounts = accounts
+
+@instrumented
+def filter_services(text, exact=False):
+    show_service_rows(*service_rows(text, exact))
+
+def cancel_pending_search():
+    global search_generation, search_after_id
+    search_generation += 1
+    if search_after_id is not None:
+        root.after_cancel(search_after_id)
+        search_after_id = None
+
+def on_search_update():
+    global search_after_id
+    cancel_pending_search()
+    search_after_id = root.after(SEARCH_DEBOUNCE_MS, run_search, search_generation)
+
+@instrumented
+def run_search(generation):
+    global search_after_id
+    if generation != search_generation:
+        return
+    search_after_id = None
+    text = search_combobox.get()
+    if selected_account_email is None and not search_all_var.get():
+        return
+    account_key = None if search_all_var.get() else selected_account_email
+    # One search feeds both the list and the suggestions.
+    found = service_index.search(text, account_key)
+    search_combobox['values'] = [service_index.docs[doc][1].get("name", "")
+                                 for doc in service_matcher.suggest(text, account_key, found=found)]
+    show_service_rows(*service_rows(text, found=found))
+
+@instrumented
+def on_search_select():
+    cancel_pending_search()
+    text = search_combobox.get()
+    filter_services(text, exact=True)
+
+search_combobox.bind("<KeyRelease>", lambda event: on_search_update())
+search_combobox.bind("<<ComboboxSelected>>", lambda event: on_search_select())
+
+@instrumented
+def refresh_services_list():
+    search_text = ""
+    try:
+        search_text = search_combobox.get()
+    except:
+        pass
+    if selected_account_email is None and not search_all_var.get():
+        return
+    cancel_pending_search()
+    filter_services(search_text)
+
+# ---- End of Service List & Search Area ----
+
+svc_button_frame_crud = tk.Frame(service_frame_crud)
+svc_button_frame_crud.grid(row=14, column=1, pady=10)
+create_svc_btn = tk.Button(svc_button_frame_crud, text="Create Service", command=lambda: create_service(), font=("Helvetica", 11))
+create_svc_btn.pack(side="left", padx=5)
+update_svc_btn = tk.Button(svc_button_frame_crud, text="Update Service", command=lambda: update_service(), font=("Helvetica", 11))
+update_svc_btn.pack(side="left", padx=5)
+delete_svc_btn = tk.Button(svc_button_frame_crud, text="Delete Service", command=lambda: delete_service(), font=("Helvetica", 11))
+delete_svc_btn.pack(side="left", padx=5)
+
+# ---------------- Context Menu for CRUD (Right-Click Options) ----------------
+current_widget = None
+def cut_text():
+    global current_widget
+    try:
+        current_widget.event_generate("<<Cut>>")
+    except Exception:
+        pass
+def copy_text():
+    global current_widget
+    try:
+        current_widget.event_generate("<<Copy>>")
+    except Exception:
+        pass
+def paste_text():
+    global current_widget
+    try:
+        current_widget.event_generate("<<Paste>>")
+    except Exception:
+        pass
+def delete_text():
+    global current_widget
+    try:
+        current_widget.delete("sel.first", "sel.last")
+    except Exception:
+        pass
+context_menu = tk.Menu(root, tearoff=0)
+context_menu.add_command(label="Cut", command=cut_text)
+context_menu.add_command(label="Copy", command=copy_text)
+context_menu.add_command(label="Paste", command=paste_text)
+context_menu.add_command(label="Delete", command=delete_text)
+def show_context_menu(event):
+    global current_widget
+    current_widget = event.widget
+    context_menu.tk_popup(event.x_root, event.y_root)
+    return "break"
+def bind_context_menu(widget):
+    widget.bind("<Button-3>", show_context_menu)
+for w in [email_entry, acc_password_entry, acc_date_entry, phone_entry,
+          sname_entry, susername_entry, semail_entry, slink_entry, swebpage_entry,
+          surl_entry, spassword_entry, spin_entry, sphone_entry, sdate_entry, snote_entry, sign_in_with_entry]:
+    bind_context_menu(w)
+bind_context_menu(sdetails_text)
+
+@instrumented
+def refresh_account_list():
+    accounts_listbox.set_rows(account_keys(data))
+
+def update_account_rows(change):
+    # Mirrors an applied account-level change in accounts_listbox, one row at a time.
+    # New and renamed accounts sit at the end of data["accounts"], before OTHERS.
+    op = change["op"]
+    if op not in ("put_account", "rename_account", "delete_account"):
+        return
+    was_selected = False
+    if op != "put_account":
+        index = accounts_listbox.index_of(change["account"])
+        if index is not None:
+            was_selected = accounts_listbox.curselection() == (index,)
+            accounts_listbox.delete(index)
+    # The list mirrors data, so a missing row shows up as a count mismatch.
+    if op != "delete_account" and accounts_listbox.size() < len(data["accounts"]) + ("OTHERS" in data):
+        index = len(data["accounts"]) - 1
+        accounts_listbox.insert(index, change.get("new", change["account"]))
+        if was_selected:
+            accounts_listbox.selection_set(index)
+
+@instrumented
+def on_account_select(event):
+    global selected_service_index
+    selection = accounts_listbox.curselection()
+    if not selection:
+        return
+    index = selection[0]
+    try:
+        show_account(accounts_listbox.get(index))
+    except ExternalChange:
+        # Another program replaced the file since the last check; reload and let the user pick again.
+        sync_external()
+        return
+    refresh_services_list()
+    clear_service_form()
+    selected_service_index = None
+    update_account_buttons()
+
+def show_account(account_key):
+    global selected_account_email, edit_mode, original_account
+    selected_account_email = account_key
+    selected_account_label_crud.config(text="Selected Account: " + selected_account_email)
+    if selected_account_email == "OTHERS":
+        account = data["OTHERS"]
+        password = reveal(account.get("password", ""))
+        dateCreated = account.get("dateCreated", "")
+        phone_arr = account.get("phone", [])
+    else:
+        account = data["accounts"].get(selected_account_email, {})
+        password = reveal(account.get("password", ""))
+        dateCreated = account.get("dateCreated", "")
+        phone_arr = account.get("phone", [])
+    edit_mode = False
+    edit_all_btn.config(text="Edit All")
+    update_acc_btn.config(bg=default_update_bg)
+    email_entry.config(state="normal")
+    email_entry.delete(0, tk.END)
+    email_entry.insert(0, selected_account_email)
+    email_entry.config(state="disabled")
+    acc_password_entry.config(state="normal")
+    acc_password_entry.delete(0, tk.END)
+    acc_password_entry.insert(0, password)
+    acc_password_entry.config(state="disabled")
+    edit_password_btn.config(text="Edit")
+    acc_date_entry.config(state="normal")
+    acc_date_entry.delete(0, tk.END)
+    acc_date_entry.insert(0, dateCreated)
+    acc_date_entry.config(state="disabled")
+    phone_entry.config(state="normal")
+    phone_entry.delete(0, tk.END)
+    phone_entry.insert(0, ", ".join(phone_arr))
+    phone_entry.config(state="disabled")
+    original_account = {
+        "email": selected_account_email,
+        "password": password,
+        "dateCreated": dateCreated,
+        "phone": phone_entry.get()
+    }
+
+def new_account():
+    global selected_account_email
+    new_email = ask_string_long("New Account", "Enter new email:")
+    if not new_email:
+        return
+    try:
+        change = new_account_change(data, new_email)
+    except VaultError as e:
+        messagebox.showwarning("Input Error", str(e))
+        return
+    new_email = change["account"]
+    record_change(change)
+    selected_account_email = new_email
+    selected_account_label_crud.config(text="Selected Account: " + new_email)
+    refresh_services_list()
+    update_account_buttons()
+
+def add_service():
+    if selected_account_email is None:
+        messagebox.showwarning("No Account Selected", "Please select an existing account first.")
+        return
+    crud_notebook.select(service_frame_crud)
+    clear_service_form()
+
+def update_account():
+    global selected_account_email, edit_mode
+    new_email = email_entry.get().strip()
+    if not new_email:
+        messagebox.showwarning("Input Error", "Email is required.")
+        return
+    password_val = acc_password_entry.get().strip()
+    date_val = acc_date_entry.get().strip()
+    phone_str = phone_entry.get().strip()
+    phone_list = [p.strip() for p in phone_str.split(",") if p.strip()] if phone_str else []
+    if edit_mode:
+        if (new_email == original_account.get("email") and
+            password_val == original_account.get("password") and
+            date_val == original_account.get("dateCreated") and
+            phone_str == original_account.get("phone")):
+            messagebox.showinfo("No Changes", "No changes made.")
+            toggle_edit_mode()
+            return
+    if selected_account_email is None:
+        messagebox.showwarning("No Account Selected", "Select an account first.")
+        return
+    fields = {"password": password_val, "dateCreated": date_val, "phone": phone_list}
+    if not protect_fields(fields, get_account_record(data, selected_account_email), ACCOUNT_SECRET_FIELDS):
+        return
+    try:
+        changes = update_account_changes(data, selected_account_email, new_email, fields)
+    except VaultError as e:
+        messagebox.showwarning("Input Error", str(e))
+        return
+    record_changes(changes)
+    selected_account_email = changes[-1]["account"]
+    selected_account_label_crud.config(text="Selected Account: " + selected_account_email)
+    update_account_buttons()
+    if edit_mode:
+        toggle_edit_mode()
+
+def delete_account():
+    global selected_account_email
+    if selected_account_email is None:
+        messagebox.showwarning("No Account Selected", "Select an account first.")
+        return
+    if selected_account_email == "OTHERS":
+        messagebox.showwarning("Action Not Allowed", "Cannot delete the reserved OTHERS account.")
+        return
+    if messagebox.askyesno("Confirm Delete", f"Delete account {selected_account_email}?"):
+        record_change({"op": "delete_account", "account": selected_account_email})
+        selected_account_email = None
+        clear_account_form()
+        show_service_rows([], [], [])
+        selected_account_label_crud.config(text="Selected Account: None")
+        update_account_buttons()
+
+def clear_account_form():
+    email_entry.config(state="normal")
+    email_entry.delete(0, tk.END)
+    email_entry.config(state="disabled")
+    acc_password_entry.config(state="normal")
+    acc_password_entry.delete(0, tk.END)
+    acc_password_entry.config(state="disabled")
+    acc_date_entry.config(state="normal")
+    acc_date_entry.delete(0, tk.END)
+    acc_date_entry.config(state="disabled")
+    phone_entry.config(state="normal")
+    phone_entry.delete(0, tk.END)
+    phone_entry.config(state="disabled")
+
+def update_account_buttons():
+    if selected_account_email:
+        add_svc_btn.config(state="normal")
+    else:
+        add_svc_btn.config(state="disabled")
+
+@instrumented
+def on_service_select(event):
+    global selected_service_index
+    selection = services_listbox.curselection()
+    if not selection:
+        return
+    # Use mapping from filtered_service_indices to get the actual service index.
+    filtered_index = selection[0]
+    if filtered_index < len(filtered_service_indices):
+        selected_service_index = filtered_service_indices[filtered_index]
+    else:
+        return
+    if filtered_service_accounts[filtered_index] != selected_account_email:
+        # A global search hit in another account; make it the selected account.
+        show_account(filtered_service_accounts[filtered_index])
+        update_account_buttons()
+    if selected_account_email == "OTHERS":
+        account = data["OTHERS"]
+    else:
+        account = data["accounts"][selected_account_email]
+    svc = account["services"][selected_service_index]
+    service_matcher.touch(svc)
+    sname_entry.delete(0, tk.END)
+    sname_entry.insert(0, svc.get("name", ""))
+    susername_entry.delete(0, tk.END)
+    susername_entry.insert(0, svc.get("username", ""))
+    semail_entry.delete(0, tk.END)
+    semail_entry.insert(0, svc.get("email", ""))
+    slink_entry.delete(0, tk.END)
+    slink_entry.insert(0, svc.get("link", ""))
+    swebpage_entry.delete(0, tk.END)
+    swebpage_entry.insert(0, svc.get("webpage", ""))
+    surl_entry.delete(0, tk.END)
+    surl_entry.insert(0, svc.get("url", ""))
+    spassword_entry.delete(0, tk.END)
+    spassword_entry.insert(0, reveal(svc.get("password", "")))
+    show_password_audit()
+    spin_entry.delete(0, tk.END)
+    spin_entry.insert(0, reveal(svc.get("PIN", "")))
+    sphone_entry.delete(0, tk.END)
+    sphone_entry.insert(0, svc.get("phone", ""))
+    sdate_entry.delete(0, tk.END)
+    sdate_entry.insert(0, svc.get("dateCreated", ""))
+    sign_in_with_entry.delete(0, tk.END)
+    sign_in_with_entry.insert(0, svc.get("sign_in_with", ""))
+    snote_entry.delete(0, tk.END)
+    snote_entry.insert(0, svc.get("note", ""))
+    show_details(svc.get("details", ""))
+
+def clear_service_form():
+    spassword_audit_label.config(text="")
+    sname_entry.delete(0, tk.END)
+    susername_entry.delete(0, tk.END)
+    semail_entry.delete(0, tk.END)
+    slink_entry.delete(0, tk.END)
+    swebpage_entry.delete(0, tk.END)
+    surl_entry.delete(0, tk.END)
+    spassword_entry.delete(0, tk.END)
+    spin_entry.delete(0, tk.END)
+    sphone_entry.delete(0, tk.END)
+    sdate_entry.delete(0, tk.END)
+    sign_in_with_entry.delete(0, tk.END)
+    snote_entry.delete(0, tk.END)
+    show_details("")
+
+def service_from_form():
+    # The Service described by the form, or None after telling the user what is missing.
+    details = details_from_form()
+    if details is None:
+        return None
+    try:
+        return service_record({
+            "name": sname_entry.get().strip(),
+            "username": susername_entry.get().strip(),
+            "email": semail_entry.get().strip(),
+            "link": slink_entry.get().strip(),
+            "webpage": swebpage_entry.get().strip(),
+            "url": surl_entry.get().strip(),
+            "password": spassword_entry.get().strip(),
+            "PIN": spin_entry.get().strip(),
+            "phone": sphone_entry.get().strip(),
+            "dateCreated": sdate_entry.get().strip(),
+            "sign_in_with": sign_in_with_entry.get().strip(),
+            "note": snote_entry.get().strip()
+        }, details)
+    except VaultError as e:
+        messagebox.showwarning("Input Error", str(e))
+        return None
+
+def create_service():
+    if selected_account_email is None:
+        messagebox.showwarning("No Account Selected", "Select an account first.")
+        return
+    new_svc = service_from_form()
+    if new_svc is None:
+        return
+    if not protect_fields(new_svc, None, SERVICE_SECRET_FIELDS):
+        return
+    record_change({"op": "add_service", "account": selected_account_email, "value": new_svc})
+    refresh_services_list()
+    clear_service_form()
+
+def update_service():
+    global selected_service_index
+    if selected_account_email is None or selected_service_index is None:
+        messagebox.showwarning("No Service Selected", "Select a service first.")
+        return
+    updated_svc = service_from_form()
+    if updated_svc is None:
+        return
+    previous = get_account_record(data, selected_account_email)["services"][selected_service_index]
+    if not protect_fields(updated_svc, previous, SERVICE_SECRET_FIELDS):
+        return
+    record_change({"op": "set_service", "account": selected_account_email,
+                   "index": selected_service_index, "value": updated_svc})
+    refresh_services_list()
+    clear_service_form()
+
+def delete_service():
+    global selected_service_index
+    if selected_account_email is None or selected_service_index is None:
+        messagebox.showwarning("No Service Selected", "Select a service first.")
+        return
+    if messagebox.askyesno("Confirm Delete", "Delete the selected service?"):
+        record_change({"op": "delete_service", "account": selected_account_email,
+                       "index": selected_service_index})
+        refresh_services_list()
+        clear_service_form()
+        selected_service_index = None
+
+def save_all():
+    error = flush_saver(compact=True)
+    if error:
+        messagebox.showerror("Error", f"Error saving JSON file: {error}")
+    else:
+        messagebox.showinfo("Save Successful", f"Data saved to {storage.filename}.")
+    refresh_main_tree()
+    index = accounts_listbox.index_of(selected_account_email) if selected_account_email else None
+    if index is not None:
+        accounts_listbox.selection_set(index)
+        accounts_listbox.see(index)
+        on_account_select(None)
+
+accounts_listbox.bind("<<ListboxSelect>>", on_account_select)
+services_listbox.bind("<<ListboxSelect>>", on_service_select)
+refresh_account_list()
+
+global_btn_frame = tk.Frame(root)
+global_btn_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+save_all_btn = tk.Button(global_btn_frame, text="Save All Changes", command=save_all, font=("Helvetica", 12, "bold"))
+save_all_btn.pack(side="left", padx=5)
+encrypt_btn = tk.Button(global_btn_frame, text="Encrypt Passwords", command=encrypt_passwords, font=("Helvetica", 12))
+encrypt_btn.pack(side="left", padx=5)
+import_btn = tk.Button(global_btn_frame, text="Import...", command=lambda: import_services(), font=("Helvetica", 12))
+import_btn.pack(side="left", padx=5)
+export_btn = tk.Button(global_btn_frame, text="Export...", command=lambda: export_all_services(), font=("Helvetica", 12))
+export_btn.pack(side="left", padx=5)
+save_status_label = tk.Label(global_btn_frame, text="", font=("Helvetica", 10))
+save_status_label.pack(side="right", padx=5)
+
+TRANSFER_FILETYPES = [("CSV files", "*.csv"), ("JSON lines", "*.jsonl"), ("All files", "*.*")]
+
+def import_services():
+    path = filedialog.askopenfilename(title="Import Services", filetypes=TRANSFER_FILETYPES)
+    if not path:
+        return
+    target = selected_account_email or "OTHERS"
+    stats = {}
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            # Everything is read first so a bad row leaves `data` untouched.
+            changes = list(import_changes(data, read_rows(file, transfer_format(path)), target, field_cipher, stats))
+    except (OSError, csv.Error, VaultError, KeyError, ValueError) as e:
+        messagebox.showerror("Import Failed", str(e))
+        return
+    record_changes(changes)
+    # One snapshot for the whole import instead of journaling every row.
+    error = flush_saver(compact=True)
+    refresh_main_tree()
+    refresh_services_list()
+    if error:
+        messagebox.showerror("Error", f"Error saving JSON file: {error}")
+    else:
+        messagebox.showinfo("Import", f"Imported {stats['added']} services into {target} "
+                                      f"({stats['duplicates']} duplicates, {stats['skipped']} rows skipped).")
+
+def export_all_services():
+    path = filedialog.asksaveasfilename(title="Export Services", defaultextension=".csv", filetypes=TRANSFER_FILETYPES)
+    if not path:
+        return
+    reveal_secrets = field_cipher is not None and messagebox.askyesno(
+        "Export", "Write passwords and PINs in plain text?")
+    load_accounts(list(data.get("accounts", {})))
+    services = ((account_key, service) for account_key, account in iter_accounts(data)
+                for service in account.get("services", []))
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            count = export_services(services, file, transfer_format(path), reveal if reveal_secrets else None)
+    except OSError as e:
+        messagebox.showerror("Export Failed", str(e))
+        return
+    messagebox.showinfo("Export", f"Exported {count} services to {path}.")
+
+# ---------------- Reuse Tab ----------------
+# Clusters of services sharing a password or PIN, and duplicate services, from
+# the buckets service_index keeps. While the tab shows, only the clusters touched
+# since the last refresh are redrawn.
+REUSE_REFRESH_MS = 500
+REUSE_TITLES = {"password": "Same password", "PIN": "Same PIN", "service": "Duplicate service"}
+reuse_tab = tk.Frame(main_notebook)
+main_notebook.add(reuse_tab, text="Reuse")
+reuse_status_label = tk.Label(reuse_tab, text="", font=("Helvetica", 10))
+reuse_status_label.pack(side="bottom", anchor="w", padx=5, pady=2)
+reuse_scrollbar = ttk.Scrollbar(reuse_tab, orient="vertical")
+reuse_scrollbar.pack(side="right", fill="y")
+reuse_tree = ttk.Treeview(reuse_tab, columns=("username", "url"), yscrollcommand=reuse_scrollbar.set)
+reuse_scrollbar.config(command=reuse_tree.yview)
+reuse_tree.heading("#0", text="Cluster / Service", anchor=tk.W)
+reuse_tree.column("#0", width=380, stretch=tk.YES)
+reuse_tree.heading("username", text="Username", anchor=tk.W)
+reuse_tree.column("username", width=180, stretch=tk.NO)
+reuse_tree.heading("url", text="URL", anchor=tk.W)
+reuse_tree.column("url", width=260, stretch=tk.YES)
+reuse_tree.pack(fill="both", expand=True, padx=5, pady=5)
+reuse_nodes = {}           # (kind, digest) -> tree item
+
+def show_cluster(kind, digest):
+    members = service_index.cluster(kind, digest)
+    item = reuse_nodes.get((kind, digest))
+    if not members:
+        if item is not None:
+            reuse_tree.delete(item)
+            del reuse_nodes[(kind, digest)]
+        return
+    if item is None:
+        item = reuse_nodes[(kind, digest)] = reuse_tree.insert("", "end")
+    else:
+        reuse_tree.delete(*reuse_tree.get_children(item))
+    title = f"{REUSE_TITLES[kind]}: {len(members)} services"
+    if kind == "service":
+        title += f" named {members[0][1].get('name', '')!r}"
+    reuse_tree.item(item, text=title)
+    for account_key, service in members:
+        reuse_tree.insert(item, "end", text=f"{account_key} / {service.get('name', '')}",
+                          values=(service.get("username", ""), service.get("url", "")))
+
+@instrumented
+def refresh_reuse_tab():
+    if main_notebook.select() == str(reuse_tab):
+        touched = service_index.take_touched()
+        if touched is None:
+            reuse_tree.delete(*reuse_tree.get_children())
+            reuse_nodes.clear()
+            for kind, digest, _ in service_index.clusters():
+                show_cluster(kind, digest)
+        else:
+            for kind, digest in touched:
+                show_cluster(kind, digest)
+        if touched is None or touched:
+            counts = collections.Counter(kind for kind, _ in reuse_nodes)
+            status = ", ".join(f"{REUSE_TITLES[kind]}: {counts[kind]}" for kind in REUSE_KINDS)
+            accounts = data.get("accounts")
+            loading = len(accounts.unloaded_keys()) if isinstance(accounts, LazyAccounts) else 0
+            if loading:
+                status += f" ({loading} accounts still loading)"
+            elif "encryption" in data and field_cipher is None:
+                status += " (encrypted passwords are left out until unlocked)"
+            reuse_status_label.config(text=status)
+    root.after(REUSE_REFRESH_MS, refresh_reuse_tab)
+
+# ---------------- Password Audit ----------------
+# Scores every stored password and looks it up in an offline breach list (see
+# core.BreachList) on a process pool. Each distinct password is audited once;
+# results are kept by its digest in service_index, so they follow the password
+# rather than the service and hold no plaintext. The Tk thread polls the pool and
+# shows progress; the service form shows the result for the password on display.
+AUDIT_POLL_MS = 100
+AUDIT_WEAK_BITS = 36       # Below this a password counts as weak (core.STRENGTH_LEVELS).
+BREACH_FILE = "breached-passwords.txt"
+audit_results = {}         # password digest -> (entropy bits, breach count or None)
+audit_job = None           # {"pool", "futures": {future: [digests]}, "done", "total", "breach_list"} while running.
+
+def show_password_audit(event=None):
+    password = spassword_entry.get()
+    if not password or is_encrypted(password):
+        spassword_audit_label.config(text="")
+        return
+    bits = password_entropy(password)
+    text = f"{strength_label(bits)} ({bits:.0f} bits)"
+    result = audit_results.get(service_index.digest("password", password))
+    if result is not None and result[1]:
+        text += f", in {result[1]:,} breaches"
+    elif result is not None and result[1] == 0:
+        text += ", not in the breach list"
+    spassword_audit_label.config(text=text, fg="red" if bits < AUDIT_WEAK_BITS or (result and result[1]) else "black")
+
+def start_audit():
+    global audit_job
+    if audit_job is not None:
+        return
+    breach_path = BREACH_FILE if os.path.exists(BREACH_FILE) else filedialog.askopenfilename(
+        title="Breach List (cancel to only score strength)",
+        filetypes=[("Sorted SHA-1 hashes", "*.txt"), ("All files", "*.*")])
+    if breach_path:
+        try:
+            BreachList(breach_path).close()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Audit", f"Cannot read the breach list: {e}")
+            return
+    passwords, locked = {}, 0
+    load_accounts(list(data.get("accounts", {})))
+    for _, account in iter_accounts(data):
+        for service in account.get("services", []):
+            password = reveal(service.get("password", ""))
+            if is_encrypted(password):
+                locked += 1
+            elif password:
+                passwords.setdefault(service_index.digest("password", password), password)
+    if not passwords:
+        messagebox.showinfo("Audit", "There are no passwords to audit.")
+        return
+    # Workers are spawned rather than forked from a process with Tk and the saver
+    # thread. They re-run only main.py, whose guard keeps them out of this module,
+    # and get plain strings to score with core.audit_chunk.
+    pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_audit_worker, initargs=(breach_path or None,))
+    items = list(passwords.items())
+    futures = {}
+    for start in range(0, len(items), AUDIT_CHUNK):
+        chunk = items[start:start + AUDIT_CHUNK]
+        futures[pool.submit(audit_chunk, [password for _, password in chunk])] = [digest for digest, _ in chunk]
+    audit_job = {"pool": pool, "futures": futures, "done": 0, "total": len(items), "locked": locked,
+                 "breach_list": bool(breach_path), "error": None}
+    audit_btn.config(state="disabled")
+    root.after(AUDIT_POLL_MS, poll_audit)
+
+def poll_audit():
+    global audit_job
+    job = audit_job
+    for future in [future for future in job["futures"] if future.done()]:
+        digests = job["futures"].pop(future)
+        try:
+            audit_results.update(zip(digests, future.result()))
+        except Exception as e:
+            job["error"] = e
+        job["done"] += len(digests)
+    audit_status_label.config(text=f"Auditing passwords: {job['done']}/{job['total']}")
+    if job["futures"]:
+        root.after(AUDIT_POLL_MS, poll_audit)
+        return
+    job["pool"].shutdown(wait=False)
+    audit_job = None
+    audit_btn.config(state="normal")
+    if job["error"] is not None:
+        audit_status_label.config(text="Audit failed")
+        messagebox.showerror("Audit", f"The password audit failed: {job['error']}")
+        return
+    weak = sum(1 for bits, _ in audit_results.values() if bits < AUDIT_WEAK_BITS)
+    summary = f"Audit: {weak} weak"
+    if job["breach_list"]:
+        summary += f", {sum(1 for _, count in audit_results.values() if count)} breached"
+    summary += f" of {job['total']} distinct passwords"
+    if job["locked"]:
+        summary += f" ({job['locked']} encrypted ones skipped while locked)"
+    audit_status_label.config(text=summary)
+    show_password_audit()
+
+def stop_audit():
+    if audit_job is not None:
+        audit_job["pool"].shutdown(wait=False, cancel_futures=True)
+
+audit_btn = tk.Button(global_btn_frame, text="Audit Passwords", command=start_audit, font=("Helvetica", 12))
+audit_btn.pack(side="left", padx=5)
+audit_status_label = tk.Label(global_btn_frame, text="", font=("Helvetica", 10))
+audit_status_label.pack(side="right", padx=5)
+spassword_entry.bind("<KeyRelease>", show_password_audit)
+
+# ---------------- Undo History ----------------
+# Each CRUD action (or import) is one step. A step is stored as the change records
+# that reverse it (storage.invert_change), which refer to the replaced services and
+# accounts instead of copying them. Undoing records those changes like any edit,
+# so they are journaled and merged as usual, and their own inverses are the redo
+# step. Only the last UNDO_DEPTH steps are kept.
+UNDO_DEPTH = 100
+undo_history = collections.deque(maxlen=UNDO_DEPTH)
+redo_history = []
+
+def clear_history():
+    undo_history.clear()
+    redo_history.clear()
+    update_history_menu()
+
+def update_history_menu():
+    edit_menu.entryconfig(0, state="normal" if undo_history else "disabled")
+    edit_menu.entryconfig(1, state="normal" if redo_history else "disabled")
+
+def refresh_selected_account(changed):
+    # Redraws the CRUD tab after the accounts in `changed` were changed behind its back.
+    global selected_account_email, selected_service_index
+    if selected_account_email in changed:
+        selected_service_index = None
+        clear_service_form()
+        known = data.get("accounts", {}) if selected_account_email != "OTHERS" else data
+        if selected_account_email not in known:
+            selected_account_email = None
+            clear_account_form()
+            show_service_rows([], [], [])
+            selected_account_label_crud.config(text="Selected Account: None")
+            update_account_buttons()
+        elif not edit_mode:
+            show_account(selected_account_email)
+    refresh_services_list()
+
+def replay_history(source, target, name):
+    global selected_account_email
+    if not source:
+        save_status_label.config(text=f"Nothing to {name.lower()}")
+        return "break"
+    changes = source.pop()
+    target.append(record_changes(changes, history=False))
+    update_history_menu()
+    changed = set()
+    for change in changes:
+        changed.update(key for key in (change.get("account"), change.get("new")) if key)
+        if change["op"] == "rename_account" and change["account"] == selected_account_email:
+            selected_account_email = change["new"]
+    refresh_main_tree()
+    refresh_selected_account(changed)
+    save_status_label.config(text=f"{name}: {len(changes)} change{'s' if len(changes) != 1 else ''}")
+    return "break"
+
+def undo(event=None):
+    return replay_history(undo_history, redo_history, "Undo")
+
+def redo(event=None):
+    return replay_history(redo_history, undo_history, "Redo")
+
+def reload_data():
+    # Recovers a session whose data file could not be loaded; edits made since are dropped.
+    global selected_account_email, selected_service_index
+    if not load_failed:
+        messagebox.showinfo("Reload", f"{storage.filename} is already loaded.")
+        return
+    loaded = load_data()
+    if load_failed:
+        return
+    with data_lock:
+        data.clear()
+        data.update(loaded)
+        saver.discard_pending()
+    saver.set_read_only(False)
+    merge_bases.clear()
+    service_index.rebuild(data)
+    clear_history()
+    selected_account_email = selected_service_index = None
+    clear_account_form()
+    clear_service_form()
+    show_service_rows([], [], [])
+    refresh_account_list()
+    refresh_main_tree(full=True)
+    save_status_label.config(text=f"Loaded {storage.filename}")
+    unlock_vault()
+
+menubar = tk.Menu(root)
+file_menu = tk.Menu(menubar, tearoff=0)
+file_menu.add_command(label="Reload Data File", command=reload_data)
+menubar.add_cascade(label="File", menu=file_menu)
+edit_menu = tk.Menu(menubar, tearoff=0)
+edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=undo, state="disabled")
+edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=redo, state="disabled")
+menubar.add_cascade(label="Edit", menu=edit_menu)
+root.bind_all("<Control-z>", undo)
+root.bind_all("<Control-y>", redo)
+root.bind_all("<Control-Z>", redo)
+
+# ---------------- Debug Tab ----------------
+debug_tab = tk.Frame(main_notebook)
+main_notebook.add(debug_tab, text="Debug")
+DEBUG_COLUMNS = (("calls", "Calls"), ("mean_ms", "Mean ms"), ("p95_ms", "p95 ms"), ("max_ms", "Max ms"), ("total_ms", "Total ms"))
+debug_tree = ttk.Treeview(debug_tab, columns=[key for key, _ in DEBUG_COLUMNS])
+debug_tree.heading("#0", text="Function", anchor=tk.W)
+debug_tree.column("#0", width=320, stretch=tk.YES)
+for key, label in DEBUG_COLUMNS:
+    debug_tree.heading(key, text=label, anchor=tk.E)
+    debug_tree.column(key, width=110, anchor=tk.E, stretch=tk.NO)
+debug_tree.pack(fill="both", expand=True, padx=5, pady=5)
+debug_status_label = tk.Label(debug_tab, text="", font=("Helvetica", 10))
+debug_status_label.pack(anchor="w", padx=5, pady=2)
+debug_rows = {}            # name -> tree item
+
+def refresh_debug_tab():
+    # Only while the tab is showing; rows are updated in place, slowest p95 first.
+    if main_notebook.select() == str(debug_tab):
+        for position, row in enumerate(sorted(timings.summary(), key=lambda row: -row["p95_ms"])):
+            values = [row["calls"]] + ["%.2f" % row[key] for key, _ in DEBUG_COLUMNS[1:]]
+            item = debug_rows.get(row["name"])
+            if item is None:
+                item = debug_rows[row["name"]] = debug_tree.insert("", "end", text=row["name"])
+            debug_tree.item(item, values=values)
+            debug_tree.move(item, "", position)
+    root.after(DEBUG_REFRESH_MS, refresh_debug_tab)
+
+profiler = None
+
+def toggle_profiling():
+    global profiler
+    if profiler is None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        debug_menu.entryconfig(0, label="Stop Profiling and Save...")
+        debug_status_label.config(text="Profiling...")
+        return
+    profiler.disable()
+    finished, profiler = profiler, None
+    debug_menu.entryconfig(0, label="Start Profiling")
+    debug_status_label.config(text="")
+    path = filedialog.asksaveasfilename(title="Save Profile", defaultextension=".prof",
+                                        filetypes=[("cProfile data", "*.prof"), ("All files", "*.*")])
+    if path:
+        finished.dump_stats(path)
+        messagebox.showinfo("Profile", f"Saved to {path}. Open it with python -m pstats or snakeviz.")
+
+def save_timings():
+    path = filedialog.asksaveasfilename(title="Save Timings", defaultextension=".json",
+                                        filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+    if not path:
+        return
+    try:
+        with open(path, "w") as file:
+            json.dump({"saved": datetime.datetime.now().isoformat(timespec="seconds"), "window": TIMING_WINDOW,
+                       "timings": timings.summary()}, file, indent=2)
+    except OSError as e:
+        messagebox.showerror("Error", str(e))
+
+debug_menu = tk.Menu(menubar, tearoff=0)
+debug_menu.add_command(label="Start Profiling", command=toggle_profiling)
+debug_menu.add_command(label="Save Timings...", command=save_timings)
+menubar.add_cascade(label="Debug", menu=debug_menu)
+root.config(menu=menubar)
+
+def on_closing():
+    # Edits are journaled either way; make sure the last debounce window is on disk.
+    compact = messagebox.askokcancel("Quit", "Do you want to save changes before quitting?")
+    error = flush_saver(compact)
+    if error and not messagebox.askyesno("Quit", f"Error saving JSON file: {error}\n\n"
+                                                 "Quit anyway and lose the changes that were not saved?"):
+        return
+    stop_audit()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_closing)
+if stream_pending:
+    stream_load()
+if load_failed:
+    save_status_label.config(text="Not loaded - changes are not saved")
+root.after_idle(unlock_vault)
+root.after(JOURNAL_COMPACT_INTERVAL_MS, compact_journal)
+root.after(SAVE_STATUS_POLL_MS, poll_save_status)
+root.after_idle(start_prefetch)
+root.after(WATCH_INTERVAL_MS, watch_data_file)
+root.after(DEBUG_REFRESH_MS, refresh_debug_tab)
+root.after(REUSE_REFRESH_MS, refresh_reuse_tab)
+root.mainloop()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from storage import JsonStorage, SERVICE_FIELDS, encode_change, json_default
+from core import ServiceIndex, ReuseIndex, FuzzyMatcher, pretty_print
+
+# Times the hot paths on a synthetic vault and writes the results as JSON, so runs
+# of different versions can be compared:
+#   python benchmark.py --accounts 2000 --services 20 -o bench-new.json
+#   python benchmark.py --compare bench-old.json bench-new.json
+# The UI timings run app.py without its main loop and need a display; on a
+# headless machine use xvfb-run, otherwise they are reported as skipped.
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+WORDS = ("netflix", "github", "amazon", "spotify", "google", "dropbox", "slack", "steam", "paypal", "reddit",
+         "twitter", "linkedin", "zoom", "notion", "figma", "adobe", "apple", "microsoft", "discord", "twitch")
+QUERIES = ("net", "hub", "spotify", "example.com", "zz")
+REGRESSION_RATIO = 1.2
+
+# ---------------- Synthetic Vault ----------------
+def synthetic_details(rng, depth, width=3):
+    if depth <= 0:
+        return f"{rng.randrange(16 ** 8):08x}"
+    if depth % 2:
+        return [synthetic_details(rng, depth - 1, width) for _ in range(width)]
+    return {f"key{n}": synthetic_details(rng, depth - 1, width) for n in range(width)}
+
+def synthetic_service(rng, account_key, n, depth):
+    word = WORDS[rng.randrange(len(WORDS))]
+    values = {field: "" for field in SERVICE_FIELDS}
+    values.update({"name": f"{word.capitalize()} {n}", "username": f"{word}_{rng.randrange(10 ** 6)}",
+                   "email": account_key, "url": f"https://{word}{n}.example.com", "password": f"pw-{rng.randrange(10 ** 9)}",
+                   "dateCreated": "2024-01-01 00:00:00",
+                   "details": synthetic_details(rng, depth) if depth else ""})
+    return values
+
+def synthetic_vault(accounts, services, depth, seed=1):
+    rng = random.Random(seed)
+    data = {"accounts": {}}
+    for a in range(accounts):
+        key = f"user{a}@example.com"
+        data["accounts"][key] = {"sign_in_with": key, "password": f"pw-{a}", "dateCreated": "2024-01-01 00:00:00",
+                                 "phone": [f"555-{a:07d}"],
+                                 "services": [synthetic_service(rng, key, n, depth) for n in range(services)]}
+    data["OTHERS"] = {"password": "", "dateCreated": "", "phone": [],
+                      "services": [synthetic_service(rng, "", n, depth) for n in range(services)]}
+    return data
+
+def write_vault(data, directory):
+    path = os.path.join(directory, "data.json")
+    with open(path, "w") as file:
+        json.dump(data, file, indent=4)
+    return path
+
+# ---------------- Timing ----------------
+def measure(results, name, func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    results[name] = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3),
+                     "max_ms": round(max(times), 3), "runs": repeat}
+    print(f"{name:44} {results[name]['median_ms']:10.2f} ms", file=sys.stderr)
+
+def storage_benchmarks(results, directory, data, repeat):
+    path = write_vault(data, directory)
+    measure(results, "load: full parse", lambda: JsonStorage(path).load(), repeat)
+    measure(results, "load: streamed", lambda: JsonStorage(path).load(stream=True), repeat)
+    store = JsonStorage(path)
+    loaded = store.load()
+    measure(results, "save: snapshot", lambda: store.save(loaded), repeat)
+    measure(results, "load: fast start (index only)", lambda: JsonStorage(path).load(lazy=True), repeat)
+    account_key = next(iter(loaded["accounts"]))
+    change = {"op": "set_service", "account": account_key, "index": 0, "value": loaded["accounts"][account_key]["services"][0]}
+    measure(results, "save: journal append (1 change)", lambda: store.append([encode_change(change)]), repeat)
+    return loaded
+
+def search_benchmarks(results, data, repeat):
+    index = ServiceIndex()
+    measure(results, "index: rebuild", lambda: index.rebuild(data), repeat)
+    measure(results, "index: rebuild with reuse buckets", lambda: ReuseIndex().rebuild(data), repeat)
+    account_key = next(iter(data["accounts"]))
+    measure(results, "search: all accounts", lambda: [index.matches(query) for query in QUERIES], repeat)
+    measure(results, "search: one account", lambda: [index.matches(query, account_key) for query in QUERIES], repeat)
+    matcher = FuzzyMatcher(index)
+    measure(results, "suggest: fuzzy", lambda: [matcher.suggest(query) for query in ("netflx", "gihub", "spotfy")], repeat)
+
+# ---------------- UI ----------------
+def load_app(directory):
+    # Runs app.py up to (not into) its main loop and returns its globals.
+    import tkinter as tk
+    tk.Tk.mainloop = lambda self, n=0: None
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        return runpy.run_path(APP_FILE, run_name="__benchmark__")["load_data"].__globals__
+    finally:
+        os.chdir(cwd)
+
+def ui_benchmarks(results, directory, data, depth, repeat):
+    write_vault(data, directory)
+    for name in ("data.json.index", "data.json.journal"):
+        if os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+    start = time.perf_counter()
+    app = load_app(directory)
+    results["ui: startup (streamed load)"] = {"median_ms": round((time.perf_counter() - start) * 1000, 3), "runs": 1}
+    print(f"{'ui: startup (streamed load)':44} {results['ui: startup (streamed load)']['median_ms']:10.2f} ms", file=sys.stderr)
+    try:
+        account_key = next(iter(app["data"]["accounts"]))
+        app["show_account"](account_key)
+        app["search_all_var"].set(False)
+        measure(results, "ui: filter_services (one account)", lambda: app["filter_services"]("net"), repeat)
+        app["search_all_var"].set(True)
+        measure(results, "ui: filter_services (all accounts)", lambda: app["filter_services"]("net"), repeat)
+
+        def search_keystroke():
+            app["search_combobox"].delete(0, "end")
+            app["search_combobox"].insert(0, "hub")
+            app["on_search_update"]()
+            app["run_search"](app["search_generation"])
+        measure(results, "ui: on_search_update + debounced run", search_keystroke, repeat)
+        measure(results, "ui: refresh_account_list", app["refresh_account_list"], repeat)
+        measure(results, "ui: refresh_main_tree (full)", lambda: app["refresh_main_tree"](full=True), repeat)
+        measure(results, "ui: refresh_main_tree (one dirty account)", app["refresh_main_tree"], repeat,
+                setup=lambda: app["mark_tree_dirty"]({"op": "put_account", "account": account_key}))
+        details = synthetic_details(random.Random(2), max(depth, 1) + 2)
+        measure(results, "ui: pretty_print (details)", lambda: pretty_print(details), repeat)
+        measure(results, "ui: show_details (first page)", lambda: app["show_details"](details), repeat)
+    finally:
+        app["saver"].flush()
+        app["root"].destroy()
+
+# ---------------- Reports ----------------
+def version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP_FILE), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    report = {"version": version(), "python": platform.python_version(), "platform": platform.platform(),
+              "params": {"accounts": args.accounts, "services": args.services, "depth": args.depth, "repeat": args.repeat},
+              "results": {}}
+    results = report["results"]
+    data = synthetic_vault(args.accounts, args.services, args.depth)
+    directory = tempfile.mkdtemp(prefix="vault-bench-")
+    try:
+        loaded = storage_benchmarks(results, directory, data, args.repeat)
+        search_benchmarks(results, loaded, args.repeat)
+        if args.skip_ui:
+            report["ui"] = "skipped: --skip-ui"
+        else:
+            try:
+                ui_benchmarks(results, directory, data, args.depth, args.repeat)
+                report["ui"] = "ok"
+            except Exception as e:    # Usually no display (tkinter.TclError).
+                report["ui"] = f"skipped: {e}"
+                print(f"UI benchmarks skipped: {e}", file=sys.stderr)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    text = json.dumps(report, indent=2, default=json_default)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+def compare(old_file, new_file, ratio=REGRESSION_RATIO):
+    # Prints every benchmark present in both reports; returns the names that got
+    # slower by more than `ratio`.
+    with open(old_file) as file:
+        old = json.load(file)
+    with open(new_file) as file:
+        new = json.load(file)
+    if old.get("params") != new.get("params"):
+        print(f"warning: different parameters {old.get('params')} vs {new.get('params')}", file=sys.stderr)
+    regressions = []
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["median_ms"], result["median_ms"]
+        change = after / before if before else float("inf")
+        flag = ""
+        if change > ratio:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:44} {before:10.2f} -> {after:10.2f} ms  x{change:5.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark loading, saving, searching and redrawing a synthetic vault.")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--services", type=int, default=10, help="services per account")
+    parser.add_argument("--depth", type=int, default=3, help="nesting depth of each service's details (0 = none)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-ui", action="store_true", help="only time storage and search")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two reports instead of running")
+    args = parser.parse_args(argv)
+    if args.compare:
+        if compare(*args.compare):
+            sys.exit(1)
+        return
+    run(args)
+
+if __name__ == "__main__":
+    main()
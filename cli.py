@@ -0,0 +1,132 @@
+import argparse
+import getpass
+import json
+import os
+import sys
+from core import Vault, VaultError, default_data_file, parse_details, export_services
+from storage import json_default, ExternalChange, ACCOUNT_SECRET_FIELDS, SERVICE_SECRET_FIELDS
+from server import serve, DEFAULT_PORT
+
+# Command-line access to the vault for scripts and batch jobs. Uses core.py only,
+# so it starts without Tk and only reads the accounts a command needs.
+#   python cli.py get user@mail.com Netflix
+#   python cli.py set user@mail.com Netflix password=hunter2 "note=family plan"
+#   python cli.py search netf
+#   python cli.py export -o services.jsonl
+#   python cli.py import chrome-passwords.csv --account user@mail.com
+#   python cli.py serve --port 8765   (HTTP/JSON API, see server.py)
+
+def dump(value):
+    print(json.dumps(value, indent=4, default=json_default))
+
+def cmd_accounts(vault, args):
+    for account_key in vault.keys():
+        print(account_key)
+
+def cmd_get(vault, args):
+    account = vault.account(args.account)
+    if args.service is None:
+        account = vault.revealed(account, ACCOUNT_SECRET_FIELDS)
+        account["services"] = [vault.revealed(service, SERVICE_SECRET_FIELDS) for service in account.get("services", [])]
+        dump(account)
+        return
+    index = vault.find_service(args.account, args.service)
+    if index is None:
+        raise VaultError(f"No service {args.service!r} in {args.account!r}.")
+    dump(vault.revealed(account["services"][index], SERVICE_SECRET_FIELDS))
+
+def cmd_set(vault, args):
+    fields = {}
+    for assignment in args.fields:
+        field, sep, value = assignment.partition("=")
+        if not sep:
+            raise VaultError(f"Expected FIELD=VALUE, got {assignment!r}.")
+        fields[field] = parse_details(value) if field == "details" else value
+    if args.create_account and args.account not in vault.keys():
+        vault.new_account(args.account)
+    index = vault.find_service(args.account, args.service)
+    if index is None:
+        fields.setdefault("name", args.service)
+        details = fields.pop("details", "")
+        vault.add_service(args.account, fields, details)
+        print(f"Added {fields['name']} to {args.account}.")
+    else:
+        vault.update_service(args.account, index, **fields)
+        print(f"Updated {args.service} in {args.account}.")
+
+def cmd_search(vault, args):
+    for account_key, _, service in vault.search(args.text, args.account, args.limit):
+        print("\t".join([account_key] + [str(service.get(field, "")) for field in ("name", "username", "url")]))
+
+def cmd_export(vault, args):
+    # Rows are written as they are produced.
+    if args.output:
+        count = vault.export_file(args.output, args.format, args.reveal)
+        print(f"Exported {count} services to {args.output}.", file=sys.stderr)
+    else:
+        export_services(vault.services(), sys.stdout, args.format or "jsonl", vault.reveal if args.reveal else None)
+
+def cmd_import(vault, args):
+    stats = vault.import_file(args.input, args.format, args.account)
+    print(f"Imported {stats['added']} services ({stats['duplicates']} duplicates, {stats['skipped']} rows skipped).")
+
+def cmd_serve(vault, args):
+    serve(vault, args.host, args.port, args.socket, args.token or os.environ.get("VAULT_API_TOKEN"))
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Read and change the account vault without the UI.")
+    parser.add_argument("--file", default=None, help=f"vault file (default: {default_data_file()})")
+    parser.add_argument("--unlock", action="store_true", help="ask for the passphrase of encrypted passwords")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("accounts", help="list account keys").set_defaults(run=cmd_accounts)
+    get = commands.add_parser("get", help="print an account or one of its services as JSON")
+    get.add_argument("account")
+    get.add_argument("service", nargs="?")
+    get.set_defaults(run=cmd_get)
+    set_ = commands.add_parser("set", help="add a service or change its fields")
+    set_.add_argument("account")
+    set_.add_argument("service")
+    set_.add_argument("fields", nargs="*", metavar="FIELD=VALUE")
+    set_.add_argument("--create-account", action="store_true", help="create the account if it does not exist")
+    set_.set_defaults(run=cmd_set)
+    search = commands.add_parser("search", help="find services by name, username, email or url")
+    search.add_argument("text")
+    search.add_argument("--account", default=None)
+    search.add_argument("--limit", type=int, default=100)
+    search.set_defaults(run=cmd_search)
+    export = commands.add_parser("export", help="write every service as CSV or JSON lines")
+    export.add_argument("-o", "--output", default=None)
+    export.add_argument("--format", choices=("csv", "jsonl"), default=None, help="default: from the file name")
+    export.add_argument("--reveal", action="store_true", help="decrypt passwords and PINs (needs --unlock)")
+    export.set_defaults(run=cmd_export)
+    import_ = commands.add_parser("import", help="add services from a CSV or JSON lines file, skipping duplicates")
+    import_.add_argument("input")
+    import_.add_argument("--format", choices=("csv", "jsonl"), default=None, help="default: from the file name")
+    import_.add_argument("--account", default="OTHERS", help="account for rows without an account column")
+    import_.set_defaults(run=cmd_import)
+    serve_ = commands.add_parser("serve", help="serve lookups and changes over a local HTTP/JSON API")
+    serve_.add_argument("--host", default="127.0.0.1")
+    serve_.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    serve_.add_argument("--socket", default=None, help="listen on this Unix socket instead of TCP")
+    serve_.add_argument("--token", default=None,
+                        help="require 'Authorization: Bearer TOKEN' (default: $VAULT_API_TOKEN, if set)")
+    serve_.set_defaults(run=cmd_serve)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        with Vault(args.file) as vault:
+            if args.unlock:
+                vault.unlock(getpass.getpass("Passphrase: "))
+            args.run(vault, args)
+    except (VaultError, RuntimeError, OSError) as e:
+        sys.exit(f"error: {e}")
+    except ExternalChange as e:
+        # An account not read yet was compacted away by another writer.
+        sys.exit(f"error: {e} Run the command again.")
+    for note in vault.conflicts:
+        print(f"merged with another writer: {note}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1095 @@
+import json
+import os
+import csv
+import re
+import bisect
+import hashlib
+import math
+import mmap
+import heapq
+import datetime
+from difflib import SequenceMatcher
+from storage import (open_storage, get_account_record, iter_accounts, iter_loaded_accounts, account_keys,
+                     apply_change, encode_change, LazyAccounts, Service, SERVICE_FIELDS, FieldCipher, is_encrypted,
+                     ACCOUNT_SECRET_FIELDS, SERVICE_SECRET_FIELDS, json_default, digest_default, ExternalChange)
+
+# The vault without any UI: search, the change records behind every CRUD action,
+# and a Vault class for scripts and the command line (cli.py). Nothing here may
+# import tkinter.
+DATA_FILE = "data.json"
+SQLITE_FILE = "data.sqlite3"
+
+def default_data_file():
+    return SQLITE_FILE if os.path.exists(SQLITE_FILE) else DATA_FILE
+
+# ---------------- Search Index ----------------
+# Trigram index over the lowercased name, username, email and url of every
+# service in every account (OTHERS included). Queries intersect the postings of
+# their trigrams and confirm the substring on the few survivors; queries shorter
+# than a trigram scan the pre-lowered text of the accounts in scope. The index
+# follows each journal change, so it never needs a full rebuild after startup.
+INDEXED_FIELDS = ("name", "username", "email", "url")
+INDEX_GRAM = 3
+GLOBAL_SEARCH_LIMIT = 500
+
+class ServiceIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.grams = {}            # trigram -> set of doc ids
+        self.docs = {}             # doc id -> (account key, service dict)
+        self.texts = {}            # doc id -> lowercased searchable text
+        self.doc_ids = {}          # id(service dict) -> doc id
+        self.account_docs = {}     # account key -> set of doc ids
+        self.positions = {}        # account key -> {id(service dict): list index}, built on demand
+        self.next_id = 0
+        self.version = 0           # Bumped on every change so dependent caches know to rebuild.
+        self.data = None           # The `data` last passed to rebuild().
+
+    @staticmethod
+    def text_of(service):
+        return "\n".join(str(service.get(field, "")).lower() for field in INDEXED_FIELDS)
+
+    @staticmethod
+    def grams_of(text):
+        return {text[i:i + INDEX_GRAM] for i in range(len(text) - INDEX_GRAM + 1)}
+
+    def rebuild(self, data):
+        self.clear()
+        self.data = data
+        for account_key, account in iter_loaded_accounts(data):
+            self.add_account(account_key, account)
+
+    def add_account(self, account_key, account):
+        for service in account.get("services", []):
+            self.add(account_key, service)
+
+    def add(self, account_key, service):
+        doc = self.next_id
+        self.next_id += 1
+        text = self.text_of(service)
+        self.docs[doc] = (account_key, service)
+        self.texts[doc] = text
+        self.doc_ids[id(service)] = doc
+        self.account_docs.setdefault(account_key, set()).add(doc)
+        for gram in self.grams_of(text):
+            self.grams.setdefault(gram, set()).add(doc)
+        self.positions.pop(account_key, None)
+        self.version += 1
+
+    def remove(self, service):
+        doc = self.doc_ids.pop(id(service), None)
+        if doc is None:
+            return
+        account_key, _ = self.docs.pop(doc)
+        for gram in self.grams_of(self.texts.pop(doc)):
+            postings = self.grams[gram]
+            postings.discard(doc)
+            if not postings:
+                del self.grams[gram]
+        self.account_docs[account_key].discard(doc)
+        self.positions.pop(account_key, None)
+        self.version += 1
+
+    def remove_account(self, account_key):
+        for doc in list(self.account_docs.get(account_key, ())):
+            self.remove(self.docs[doc][1])
+        self.account_docs.pop(account_key, None)
+
+    def apply_change(self, data, change):
+        # Called before the change is applied, while `data` still holds the old values.
+        op = change["op"]
+        account_key = change.get("account")
+        if op == "put_account":
+            self.remove_account(account_key)
+            for service in change["value"].get("services", []):
+                self.add(account_key, service)
+        elif op == "rename_account":
+            docs = self.account_docs.pop(account_key, set())
+            for doc in docs:
+                self.docs[doc] = (change["new"], self.docs[doc][1])
+            self.account_docs[change["new"]] = docs
+            self.positions.pop(account_key, None)
+            self.version += 1
+        elif op == "delete_account":
+            self.remove_account(account_key)
+        elif op == "add_service":
+            self.add(account_key, change["value"])
+        elif op == "set_service":
+            self.remove(get_account_record(data, account_key)["services"][change["index"]])
+            self.add(account_key, change["value"])
+        elif op == "delete_service":
+            self.remove(get_account_record(data, account_key)["services"][change["index"]])
+
+    def candidates(self, text, account_key=None):
+        scope = self.docs.keys() if account_key is None else self.account_docs.get(account_key, set())
+        if len(text) < INDEX_GRAM:
+            return scope
+        postings = sorted((self.grams.get(gram, set()) for gram in self.grams_of(text)), key=len)
+        result = set(postings[0])
+        for other in postings[1:]:
+            result &= other
+            if not result:
+                break
+        if account_key is not None:
+            result &= scope
+        return result
+
+    def search(self, text, account_key=None):
+        text = text.lower()
+        texts = self.texts
+        return [doc for doc in self.candidates(text, account_key) if text in texts[doc]]
+
+    def position_of(self, account_key, service):
+        positions = self.positions.get(account_key)
+        if positions is None:
+            services = get_account_record(self.data, account_key).get("services", [])
+            positions = self.positions[account_key] = {id(svc): i for i, svc in enumerate(services)}
+        return positions[id(service)]
+
+    def matches(self, text, account_key=None, found=None):
+        # (account key, service index) pairs in display order; `found` is a search()
+        # result for the same text and scope, when the caller has one already.
+        order = {key: i for i, key in enumerate(account_keys(self.data))}
+        rows = []
+        for doc in (self.search(text, account_key) if found is None else found):
+            key, service = self.docs[doc]
+            rows.append((order.get(key, len(order)), key, self.position_of(key, service)))
+        rows.sort()
+        return [(key, i) for _, key, i in rows]
+
+# ---------------- Reuse Analysis ----------------
+# A ServiceIndex that also files each service it indexes into hash buckets: one
+# for its password, one for its PIN and one for its normalized (name, url,
+# username). A bucket holding more than one service is a cluster, a reused secret
+# or a duplicate service, so one pass finds them all and every later change only
+# moves the services it touches. Bucket keys are keyed hashes with a random key
+# per index, so no plaintext is kept; encrypted secrets are compared through
+# `reveal` and left out while the vault is locked.
+REUSE_KINDS = ("password", "PIN", "service")
+URL_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://")
+
+def normalized_url(url):
+    url = URL_SCHEME.sub("", str(url).strip().lower())
+    if url.startswith("www."):
+        url = url[4:]
+    return url.rstrip("/")
+
+def service_identity(service):
+    return "\0".join((" ".join(str(service.get("name", "")).lower().split()), normalized_url(service.get("url", "")),
+                      str(service.get("username", "")).strip().lower()))
+
+class ReuseIndex(ServiceIndex):
+    def __init__(self, reveal=None):
+        self.reveal = reveal
+        self.key = os.urandom(16)
+        super().__init__()
+
+    def clear(self):
+        super().clear()
+        self.buckets = {kind: {} for kind in REUSE_KINDS}    # kind -> digest -> set of doc ids
+        self.doc_buckets = {}      # doc id -> [(kind, digest)]
+        self.touched = None        # (kind, digest) of buckets changed since take_touched(); None: all of them
+
+    def digest(self, kind, text):
+        return hashlib.blake2b(f"{kind}\0{text}".encode("utf-8"), key=self.key, digest_size=16).digest()
+
+    def bucket_keys(self, service):
+        keys = []
+        for kind in ("password", "PIN"):
+            value = service.get(kind, "")
+            if value and self.reveal is not None:
+                value = self.reveal(value)
+            if value and not is_encrypted(value):
+                keys.append((kind, self.digest(kind, value)))
+        keys.append(("service", self.digest("service", service_identity(service))))
+        return keys
+
+    def file(self, doc, service):
+        keys = self.doc_buckets[doc] = self.bucket_keys(service)
+        for kind, digest in keys:
+            self.buckets[kind].setdefault(digest, set()).add(doc)
+        self.touch(keys)
+
+    def touch(self, keys):
+        if self.touched is not None:
+            self.touched.update(keys)
+
+    def add(self, account_key, service):
+        super().add(account_key, service)
+        self.file(self.doc_ids[id(service)], service)
+
+    def remove(self, service):
+        doc = self.doc_ids.get(id(service))
+        super().remove(service)
+        keys = self.doc_buckets.pop(doc, ())
+        for kind, digest in keys:
+            bucket = self.buckets[kind][digest]
+            bucket.discard(doc)
+            if not bucket:
+                del self.buckets[kind][digest]
+        self.touch(keys)
+
+    def apply_change(self, data, change):
+        if change["op"] == "rename_account":
+            # The clusters stay the same but show the new account key.
+            for doc in self.account_docs.get(change["account"], ()):
+                self.touch(self.doc_buckets[doc])
+        super().apply_change(data, change)
+
+    def rebucket(self):
+        # After `reveal` can decrypt what it could not before.
+        self.buckets = {kind: {} for kind in REUSE_KINDS}
+        self.doc_buckets = {}
+        for doc, (_, service) in self.docs.items():
+            self.file(doc, service)
+        self.touched = None
+
+    def take_touched(self):
+        touched, self.touched = self.touched, set()
+        return touched
+
+    def cluster(self, kind, digest):
+        # [(account key, service)] of a bucket, or [] when it is not a cluster.
+        docs = self.buckets[kind].get(digest, ())
+        return [self.docs[doc] for doc in sorted(docs)] if len(docs) > 1 else []
+
+    def clusters(self):
+        # (kind, digest, members), largest clusters first.
+        found = [(kind, digest, self.cluster(kind, digest)) for kind in REUSE_KINDS
+                 for digest, docs in self.buckets[kind].items() if len(docs) > 1]
+        found.sort(key=lambda item: (-len(item[2]), REUSE_KINDS.index(item[0])))
+        return found
+
+# ---------------- Fuzzy Suggestions ----------------
+# Ranked suggestions for the search combobox. A service name matches when the
+# query is a subsequence of it; names of the scope are kept in one newline-joined
+# string so the first keystroke is a single regex scan, and a query that extends
+# the previous one only re-checks the previous candidates. When fewer than
+# SUGGESTION_LIMIT names match, names sharing trigrams with the query are scored
+# by edit distance so one or two typos still find the service.
+SUGGESTION_LIMIT = 20
+RECENT_LIMIT = 200
+
+def prefix_edit_distance(query, name, limit):
+    # Smallest edit distance between `query` and any prefix of `name`, or limit + 1.
+    previous = list(range(len(query) + 1))
+    best = previous[-1]
+    for j, ch in enumerate(name, 1):
+        current = [j]
+        for i, qch in enumerate(query, 1):
+            current.append(min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (qch != ch)))
+        best = min(best, current[-1])
+        if min(current) > limit:
+            break
+        previous = current
+    return best if best <= limit else limit + 1
+
+class FuzzyMatcher:
+    def __init__(self, index):
+        self.index = index
+        self.version = None
+        self.scopes = {}           # account key or None -> (joined names, start offsets, docs)
+        self.lowered = {}          # doc id -> lowercased name
+        self.recent = {}           # doc id -> use tick, most recent last
+        self.tick = 0
+        self.last = None           # (scope, version, query, candidates, last tier scanned)
+
+    def scope(self, account_key):
+        if self.version != self.index.version:
+            self.version = self.index.version
+            self.scopes.clear()
+            self.lowered.clear()
+        cached = self.scopes.get(account_key)
+        if cached is None:
+            docs = sorted(self.index.docs if account_key is None else self.index.account_docs.get(account_key, ()))
+            names = [self.name_of(doc) for doc in docs]
+            offsets, position = [], 0
+            for name in names:
+                offsets.append(position)
+                position += len(name) + 1
+            cached = self.scopes[account_key] = ("\n".join(names), offsets, docs)
+        return cached
+
+    def name_of(self, doc):
+        name = self.lowered.get(doc)
+        if name is None:
+            name = self.lowered[doc] = str(self.index.docs[doc][1].get("name", "")).lower().replace("\n", " ")
+        return name
+
+    def touch(self, service):
+        doc = self.index.doc_ids.get(id(service))
+        if doc is None:
+            return
+        self.tick += 1
+        self.recent.pop(doc, None)
+        self.recent[doc] = self.tick
+        while len(self.recent) > RECENT_LIMIT:
+            del self.recent[next(iter(self.recent))]
+
+    def score(self, query, name, doc, span):
+        pos = name.find(query)
+        if pos == 0:
+            score = 100.0
+        elif pos > 0:
+            score = 70.0 if not name[pos - 1].isalnum() else 60.0
+        else:
+            score = 30.0 - (span - len(query))
+        last_used = self.recent.get(doc)
+        if last_used is not None:
+            score += 25.0 * (1.0 - (self.tick - last_used) / RECENT_LIMIT)
+        return score - 0.05 * len(name)
+
+    @staticmethod
+    def tiers(query):
+        escaped = re.escape(query)
+        return (re.compile("^" + escaped, re.M), re.compile(escaped),
+                re.compile("".join(re.escape(ch) + "[^\n]*?" for ch in query[:-1]) + re.escape(query[-1])))
+
+    def scan(self, query, joined, offsets, docs, limit):
+        # Prefix, then substring, then subsequence matches. A tier never outranks the
+        # one before it, so once `limit` names are found the later tiers are skipped.
+        scored = {}
+        tiers = self.tiers(query)
+        for tier, pattern in enumerate(tiers):
+            for match in pattern.finditer(joined):
+                doc = docs[bisect.bisect_right(offsets, match.start()) - 1]
+                if doc not in scored:
+                    scored[doc] = match.end() - match.start()
+            if len(scored) >= limit:
+                return scored, tier
+        return scored, len(tiers) - 1
+
+    def refine(self, query, candidates, max_tier):
+        # A name matching `query` at some tier matched the shorter query at that tier
+        # too, so the previous candidates hold every match up to `max_tier`.
+        scored = {}
+        tiers = self.tiers(query)
+        for doc in candidates:
+            name = self.name_of(doc)
+            for tier, pattern in enumerate(tiers[:max_tier + 1]):
+                match = pattern.search(name)
+                if match:
+                    scored[doc] = match.end() - match.start()
+                    break
+        return scored
+
+    def suggest(self, query, account_key=None, limit=SUGGESTION_LIMIT, found=None):
+        query = query.lower().replace("\n", " ")
+        joined, offsets, docs = self.scope(account_key)
+        if not query:
+            self.last = None
+            return sorted(docs, key=lambda doc: -self.recent.get(doc, 0))[:limit]
+        scored = None
+        if found is not None:
+            # A ServiceIndex.search() result for the query holds every name containing
+            # it, so it stands in for the prefix and substring tiers.
+            scored, tier = {doc: len(query) for doc in sorted(found) if query in self.name_of(doc)}, 1
+            if len(scored) < limit:
+                scored = None
+        last = self.last
+        if scored is None and last and last[:2] == (account_key, self.version) and query.startswith(last[2]):
+            scored, tier = self.refine(query, last[3], last[4]), last[4]
+            if len(scored) < limit and tier < 2:
+                scored = None
+        if scored is None:
+            scored, tier = self.scan(query, joined, offsets, docs, limit)
+        self.last = (account_key, self.version, query, list(scored), tier)
+        ranked = heapq.nlargest(limit, scored, key=lambda doc: self.score(query, self.name_of(doc), doc, scored[doc]))
+        if len(ranked) < limit and len(query) > INDEX_GRAM:
+            ranked.extend(self.typo_matches(query, account_key, limit - len(ranked), scored))
+        return ranked
+
+    def typo_matches(self, query, account_key, limit, exclude):
+        max_typos = 1 if len(query) < 7 else 2
+        grams = self.index.grams_of(query)
+        needed = max(1, len(grams) - INDEX_GRAM * max_typos)
+        common = max(1, len(self.index.docs) // 2)
+        overlap = {}
+        for gram in grams:
+            postings = self.index.grams.get(gram, ())
+            if len(postings) > common:
+                continue
+            for doc in postings:
+                overlap[doc] = overlap.get(doc, 0) + 1
+        scope = None if account_key is None else self.index.account_docs.get(account_key, set())
+        found = []
+        for doc, shared in overlap.items():
+            if shared < needed or doc in exclude or (scope is not None and doc not in scope):
+                continue
+            distance = prefix_edit_distance(query, self.name_of(doc), max_typos)
+            if distance <= max_typos:
+                found.append((distance, -self.recent.get(doc, 0), len(self.name_of(doc)), doc))
+        return [doc for *_, doc in heapq.nsmallest(limit, found)]
+
+# ---------------- Pretty Print ----------------
+# The indented outline the details box shows. pretty_lines() yields it one line
+# at a time, so rendering is linear in the output and can stop anywhere; each
+# list item is "- " plus the item's own outline with surrounding whitespace
+# trimmed, exactly as pretty_print() always laid it out. Containers nested deeper
+# than PRETTY_MAX_DEPTH and values longer than PRETTY_MAX_VALUE are cut short.
+PRETTY_MAX_DEPTH = 16
+PRETTY_MAX_VALUE = 2000
+
+def pretty_lines(value, indent=0):
+    spacing = "  " * indent
+    if isinstance(value, (dict, list)) and indent >= PRETTY_MAX_DEPTH:
+        yield f"{spacing}... ({len(value)} entries nested too deeply)"
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                yield f"{spacing}{key}:"
+                yield from pretty_lines(item, indent + 1)
+            else:
+                yield f"{spacing}{key}: {shorten(item)}"
+    elif isinstance(value, list):
+        for item in value:
+            prefix = f"{spacing}- "
+            for line in stripped_lines(pretty_lines(item, indent + 1)):
+                yield prefix + line
+                prefix = ""
+            if prefix:
+                yield prefix
+    else:
+        yield f"{spacing}{shorten(value)}"
+
+def stripped_lines(lines):
+    # Like "\n".join(lines).strip().split("\n") without joining: leading blank lines
+    # are dropped as they come, trailing ones held back until more text follows.
+    last, blank = None, []
+    for line in lines:
+        if last is None:
+            if line.strip():
+                last = line.lstrip()
+        elif line.strip():
+            yield last
+            yield from blank
+            last, blank = line, []
+        else:
+            blank.append(line)
+    if last is not None:
+        yield last.rstrip()
+
+def shorten(value):
+    text = str(value)
+    return text if len(text) <= PRETTY_MAX_VALUE else text[:PRETTY_MAX_VALUE] + f"... ({len(text)} characters)"
+
+def pretty_print(data, indent=0):
+    return "".join(line + "\n" for line in pretty_lines(data, indent))
+
+# ---------------- Change Records ----------------
+# The checks and change records behind the CRUD actions. Invalid input raises
+# VaultError with the message the UI shows.
+class VaultError(ValueError):
+    pass
+
+def timestamp():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def parse_details(text):
+    text = text.strip()
+    if not text:
+        return ""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def service_record(fields, details=""):
+    # The fields in the order the service form writes them; missing ones are "".
+    values = {field: fields.get(field, "") for field in SERVICE_FIELDS if field != "details"}
+    values["details"] = parse_details(details) if isinstance(details, str) else details
+    values.update((key, value) for key, value in fields.items() if key not in values)
+    if not values["name"]:
+        raise VaultError("Service name is required.")
+    return Service(values)
+
+def new_account_change(data, account_key, created=None):
+    account_key = account_key.strip()
+    if not account_key:
+        raise VaultError("Email is required.")
+    if account_key == "OTHERS":
+        raise VaultError("The account name 'OTHERS' is reserved.")
+    if account_key in data.get("accounts", {}):
+        raise VaultError("Account with this email already exists.")
+    return {"op": "put_account", "account": account_key, "value": {
+        "sign_in_with": account_key,
+        "password": "",
+        "dateCreated": created or timestamp(),
+        "phone": [],
+        "services": []
+    }}
+
+def update_account_changes(data, account_key, new_key, fields):
+    new_key = new_key.strip()
+    if not new_key:
+        raise VaultError("Email is required.")
+    changes = []
+    if account_key != "OTHERS" and new_key != account_key:
+        if new_key in data["accounts"]:
+            raise VaultError("Account with this email already exists.")
+        changes.append({"op": "rename_account", "account": account_key, "new": new_key})
+        account_key = new_key
+    changes.append({"op": "update_account", "account": account_key, "fields": fields})
+    return changes
+
+def protect_secrets(data, cipher, values, previous, fields):
+    # Encrypts the changed secret fields of `values` in place when the vault uses
+    # encryption; unchanged ones keep their stored token.
+    if "encryption" not in data:
+        return values
+    for field in fields:
+        value = values.get(field, "")
+        stored = previous.get(field) if previous else None
+        if not value or value == stored:
+            continue
+        if cipher is None:
+            raise VaultError("Unlock the encrypted passwords before changing them.")
+        values[field] = cipher.protect(value, stored)
+    return values
+
+# ---------------- Import and Export ----------------
+# Rows are streamed from CSV (our own exports and the password exports of the
+# common browsers and password managers) or JSON lines, mapped onto the service
+# fields, and turned into add_service changes. A service already present with the
+# same account, name, url and username is skipped via a set lookup.
+IMPORT_COLUMNS = {
+    "account": "account", "title": "name", "name": "name",
+    "url": "url", "uri": "url", "login_uri": "url", "website": "url", "web_site": "url",
+    "username": "username", "login_username": "username", "login": "username", "user": "username",
+    "email": "email", "password": "password", "login_password": "password",
+    "note": "note", "notes": "note", "extra": "note", "comments": "note",
+    "pin": "PIN", "phone": "phone", "link": "link", "webpage": "webpage",
+    "datecreated": "dateCreated", "date_created": "dateCreated",
+    "sign_in_with": "sign_in_with", "signinwith": "sign_in_with", "details": "details",
+}
+EXPORT_COLUMNS = ("account",) + SERVICE_FIELDS
+
+def transfer_format(path, fmt=None):
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt not in ("csv", "jsonl"):
+        raise VaultError(f"Unknown format {fmt!r}; use csv or jsonl.")
+    return fmt
+
+def read_rows(file, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+        return
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise VaultError(f"Line {number}: {e}") from None
+
+def map_row(row):
+    # Returns (account or None, service fields, details).
+    fields = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        field = column if column in SERVICE_FIELDS else IMPORT_COLUMNS.get(column.strip().lower().replace(" ", "_"))
+        if field and field not in fields and value != "":
+            fields[field] = value if isinstance(value, (str, dict, list)) else str(value)
+    if not fields.get("name") and fields.get("url"):
+        # Firefox exports have no name column.
+        host = fields["url"].split("://", 1)[-1].split("/", 1)[0]
+        fields["name"] = host[4:] if host.startswith("www.") else host
+    details = fields.pop("details", "")
+    return fields.pop("account", None), fields, details
+
+def service_key(account_key, service):
+    return (account_key,) + tuple(str(service.get(field, "")).strip().lower() for field in ("name", "url", "username"))
+
+def import_changes(data, rows, default_account="OTHERS", cipher=None, stats=None):
+    # Yields the changes for `rows`; `stats` counts added, duplicate and skipped rows.
+    if "encryption" in data and cipher is None:
+        raise VaultError("Unlock the encrypted passwords before importing.")
+    default_account = (default_account or "").strip() or "OTHERS"
+    stats = {} if stats is None else stats
+    for counter in ("added", "duplicates", "skipped"):
+        stats.setdefault(counter, 0)
+    known = set(account_keys(data))
+    seen = {service_key(account_key, service) for account_key, account in iter_accounts(data)
+            for service in account.get("services", [])}
+    for row in rows:
+        if not isinstance(row, dict):
+            stats["skipped"] += 1
+            continue
+        account_key, fields, details = map_row(row)
+        if account_key is not None and not isinstance(account_key, str):
+            stats["skipped"] += 1
+            continue
+        account_key = (account_key or "").strip() or default_account
+        try:
+            service = service_record(fields, details)
+        except VaultError:
+            stats["skipped"] += 1
+            continue
+        key = service_key(account_key, service)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        if account_key not in known:
+            if account_key == "OTHERS":
+                yield {"op": "update_account", "account": "OTHERS", "fields": {"services": []}}
+            else:
+                change = new_account_change(data, account_key)
+                account_key = change["account"]
+                yield change
+            known.add(account_key)
+        protect_secrets(data, cipher, service, None, SERVICE_SECRET_FIELDS)
+        stats["added"] += 1
+        yield {"op": "add_service", "account": account_key, "value": service}
+
+def export_services(services, file, fmt, reveal=None):
+    # Streams (account, service) pairs; `reveal` decrypts secrets when given.
+    writer = csv.DictWriter(file, EXPORT_COLUMNS, extrasaction="ignore") if fmt == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+    count = 0
+    for account_key, service in services:
+        record = {"account": account_key, **service}
+        if reveal is not None:
+            for field in SERVICE_SECRET_FIELDS:
+                if field in record:
+                    record[field] = reveal(record[field])
+        if writer is not None:
+            details = record.get("details", "")
+            if not isinstance(details, str):
+                record["details"] = json.dumps(details, default=json_default)
+            writer.writerow(record)
+        else:
+            file.write(json.dumps(record, default=json_default) + "\n")
+        count += 1
+    return count
+
+# ---------------- Merging External Changes ----------------
+# `bases` maps every account changed since the last sync with the file to
+# [its JSON at that sync ("null" if it did not exist), number of the last change
+# to it]. Together with what is on disk now that gives a three-way merge: an
+# account only one side changed is taken from that side, otherwise fields are
+# merged one by one and services as a sequence. Where both sides changed the
+# same thing ours wins, and a service edited on both sides is kept twice.
+MISSING = object()
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, default=digest_default)
+
+def same(a, b):
+    if a is MISSING or b is MISSING:
+        return a is b
+    return canonical(a) == canonical(b)
+
+def remember_base(bases, data, change, number):
+    for account_key in (change.get("account"), change.get("new")):
+        if account_key is None:
+            continue
+        if account_key not in bases:
+            value = data.get("OTHERS") if account_key == "OTHERS" else data.get("accounts", {}).get(account_key)
+            bases[account_key] = [canonical(value), number]
+        bases[account_key][1] = number
+
+def forget_bases(bases, written):
+    # Accounts whose changes are all on disk now have the file as their base.
+    for account_key in [key for key, (_, number) in bases.items() if number <= written]:
+        del bases[account_key]
+
+def merge_services(label, base, ours, theirs, conflicts):
+    base_keys, our_keys, keys = ([canonical(service) for service in services] for services in (base, ours, theirs))
+    if our_keys == base_keys:
+        return list(theirs)
+    if keys == base_keys or keys == our_keys:
+        return list(ours)
+    merged, clashed = list(theirs), False
+    # Replay our edits onto theirs from the end, so earlier positions stay valid.
+    for tag, i1, i2, j1, j2 in reversed(SequenceMatcher(None, base_keys, our_keys, autojunk=False).get_opcodes()):
+        if tag == "equal":
+            continue
+        found = []
+        for key in base_keys[i1:i2]:
+            position = next((i for i, other in enumerate(keys) if other == key and i not in found), None)
+            if position is None:
+                clashed = True      # They changed or removed it too; their copy stays.
+            else:
+                found.append(position)
+        for position in sorted(found, reverse=True):
+            del merged[position], keys[position]
+        if found:
+            at = min(found)
+        elif i1 > 0 and base_keys[i1 - 1] in keys:
+            at = keys.index(base_keys[i1 - 1]) + 1
+        elif i2 < len(base_keys) and base_keys[i2] in keys:
+            at = keys.index(base_keys[i2])
+        else:
+            at = len(merged)
+        merged[at:at] = ours[j1:j2]
+        keys[at:at] = our_keys[j1:j2]
+    if clashed:
+        conflicts.append(f"{label}: services were changed on both sides; both versions were kept.")
+    return merged
+
+def merge_fields(label, base, ours, theirs, conflicts):
+    merged = {}
+    for field in list(theirs) + [field for field in ours if field not in theirs]:
+        old, mine, other = base.get(field, MISSING), ours.get(field, MISSING), theirs.get(field, MISSING)
+        if field == "services" and all(isinstance(value, list) or value is MISSING for value in (old, mine, other)):
+            value = merge_services(label, old if old is not MISSING else [], mine if mine is not MISSING else [],
+                                   other if other is not MISSING else [], conflicts)
+        elif same(mine, old):
+            value = other
+        elif same(other, old) or same(other, mine):
+            value = mine
+        else:
+            conflicts.append(f"{label}: {field!r} was changed on both sides; kept this copy's value.")
+            value = mine
+        if value is not MISSING:
+            merged[field] = value
+    return merged
+
+def merge_account(label, base, ours, theirs, conflicts):
+    if canonical(theirs) == base:
+        return ours
+    if canonical(ours) in (base, canonical(theirs)):
+        return theirs
+    if ours is None or theirs is None:
+        conflicts.append(f"{label}: deleted on one side and changed on the other; kept the changed copy.")
+        return theirs if ours is None else ours
+    if not isinstance(ours, dict) or not isinstance(theirs, dict):
+        conflicts.append(f"{label}: changed on both sides; kept this copy.")
+        return ours
+    base = json.loads(base)
+    return merge_fields(label, base if isinstance(base, dict) else {}, ours, theirs, conflicts)
+
+def merge_data(bases, ours, theirs):
+    # Returns the merged data and a list of human-readable conflict notes.
+    conflicts = []
+    merged = {key: value for key, value in theirs.items() if key not in ("accounts", "OTHERS")}
+    merged.update((key, value) for key, value in ours.items() if key not in ("accounts", "OTHERS"))
+    our_accounts, their_accounts = ours.get("accounts", {}), theirs.get("accounts", {})
+    accounts = merged["accounts"] = {}
+    for account_key in list(their_accounts) + [key for key in our_accounts if key not in their_accounts]:
+        if account_key in bases:
+            value = merge_account(account_key, bases[account_key][0], our_accounts.get(account_key),
+                                  their_accounts.get(account_key), conflicts)
+        else:
+            value = their_accounts.get(account_key)
+        if value is not None:
+            accounts[account_key] = value
+    others = theirs.get("OTHERS")
+    if "OTHERS" in bases:
+        others = merge_account("OTHERS", bases["OTHERS"][0], ours.get("OTHERS"), others, conflicts)
+    if others is not None:
+        merged["OTHERS"] = others
+    return merged, conflicts
+
+def install_data(data, new, index=None):
+    # Makes `data` equal to `new` in place, replacing only the accounts that differ
+    # (and keeping `index` in step). Returns the keys of the accounts that changed.
+    def put(account_key, value):
+        if index is not None:
+            index.remove_account(account_key)
+            index.add_account(account_key, value)
+        if account_key == "OTHERS":
+            data["OTHERS"] = value
+        else:
+            accounts[account_key] = value
+        changed.append(account_key)
+    changed = []
+    accounts = data.setdefault("accounts", {})
+    new_accounts = new.get("accounts", {})
+    for account_key in [key for key in accounts if key not in new_accounts]:
+        if index is not None:
+            index.remove_account(account_key)
+        del accounts[account_key]
+        changed.append(account_key)
+    for account_key, value in new_accounts.items():
+        if isinstance(accounts, LazyAccounts) and account_key in accounts and not accounts.is_loaded(account_key):
+            accounts.install(account_key, value)
+        elif account_key not in accounts or canonical(accounts[account_key]) != canonical(value):
+            put(account_key, value)
+    if "OTHERS" in new:
+        if canonical(data.get("OTHERS")) != canonical(new["OTHERS"]):
+            put("OTHERS", new["OTHERS"])
+    elif "OTHERS" in data:
+        if index is not None:
+            index.remove_account("OTHERS")
+        del data["OTHERS"]
+        changed.append("OTHERS")
+    for key in [key for key in data if key not in ("accounts", "OTHERS") and key not in new]:
+        del data[key]
+    data.update((key, value) for key, value in new.items() if key not in ("accounts", "OTHERS"))
+    return changed
+
+# ---------------- Password Audit ----------------
+# Strength scores and breach-list checks for stored passwords. The breach list is
+# a text file of SHA-1 hashes sorted by hash, one per line and optionally followed
+# by ":count" (the Pwned Passwords download). It is memory-mapped and
+# binary-searched, so only the pages a lookup touches are read. Audits run
+# audit_chunk() on worker processes, each of which maps the file itself.
+STRENGTH_LEVELS = ((28, "very weak"), (36, "weak"), (60, "reasonable"), (128, "strong"))
+AUDIT_CHUNK = 500
+audit_breach_list = None   # Set in each worker process by init_audit_worker().
+
+def password_entropy(password):
+    # Length times log2 of the character classes used, the usual rough estimate.
+    # Runs of the same character count once.
+    pool = 0
+    if any(c.islower() for c in password):
+        pool += 26
+    if any(c.isupper() for c in password):
+        pool += 26
+    if any(c.isdigit() for c in password):
+        pool += 10
+    if any(c.isascii() and not c.isalnum() for c in password):
+        pool += 33
+    if any(not c.isascii() for c in password):
+        pool += 100
+    length = sum(1 for i, c in enumerate(password) if i == 0 or c != password[i - 1])
+    return length * math.log2(pool) if pool else 0.0
+
+def strength_label(bits):
+    for limit, label in STRENGTH_LEVELS:
+        if bits < limit:
+            return label
+    return "very strong"
+
+class BreachList:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise VaultError(f"{path} is empty.") from None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def count(self, password):
+        # How often the list says the password was breached; 0 when it is not listed.
+        target = hashlib.sha1(password.encode("utf-8")).hexdigest().upper().encode("ascii")
+        low, high = 0, len(self.map)
+        while low < high:
+            middle = (low + high) // 2
+            start = self.map.rfind(b"\n", 0, middle) + 1
+            end = self.map.find(b"\n", middle)
+            if end < 0:
+                end = len(self.map)
+            line = self.map[start:end].strip()
+            key = line[:40].upper()
+            if key == target:
+                count = line[41:]
+                return int(count) if count.isdigit() else 1
+            if key < target:
+                low = end + 1
+            else:
+                high = start
+        return 0
+
+def init_audit_worker(breach_path):
+    global audit_breach_list
+    audit_breach_list = BreachList(breach_path) if breach_path else None
+
+def audit_chunk(passwords):
+    # [(entropy bits, breach count or None without a breach list)] in order.
+    return [(round(password_entropy(password), 1),
+             audit_breach_list.count(password) if audit_breach_list is not None else None) for password in passwords]
+
+# ---------------- Vault ----------------
+# Opens a vault the way the UI does (fast start, journaled changes) but commits
+# synchronously: nothing reaches the disk until commit() or close().
+class Vault:
+    def __init__(self, filename=None, lazy=True):
+        self.storage = open_storage(filename or default_data_file())
+        self.data = self.storage.load(lazy=lazy)
+        self.index = ServiceIndex()
+        self.index.rebuild(self.data)
+        if isinstance(self.data.get("accounts"), LazyAccounts):
+            self.data["accounts"].on_load = self.index.add_account
+        self.matcher = FuzzyMatcher(self.index)
+        self.cipher = None
+        self.pending = []
+        self.bases = {}
+        self.conflicts = []        # Notes from merges with changes other processes made.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def unlock(self, passphrase):
+        if "encryption" in self.data:
+            try:
+                self.cipher = FieldCipher.unlock(passphrase, self.data["encryption"])
+            except ValueError:
+                raise VaultError("Wrong passphrase.") from None
+
+    def reveal(self, value):
+        return self.cipher.decrypt(value) if self.cipher is not None and is_encrypted(value) else value
+
+    def revealed(self, record, fields):
+        record = dict(record)
+        for field in fields:
+            if field in record:
+                record[field] = self.reveal(record[field])
+        return record
+
+    def keys(self):
+        return account_keys(self.data)
+
+    def has_account(self, account_key):
+        return "OTHERS" in self.data if account_key == "OTHERS" else account_key in self.data.get("accounts", {})
+
+    def account(self, account_key):
+        if not self.has_account(account_key):
+            raise VaultError(f"No account {account_key!r}.")
+        return get_account_record(self.data, account_key)
+
+    def load_all(self):
+        accounts = self.data.get("accounts", {})
+        for account_key in list(accounts):
+            accounts[account_key]
+
+    def find_service(self, account_key, name):
+        name = name.lower()
+        for i, service in enumerate(self.account(account_key).get("services", [])):
+            if str(service.get("name", "")).lower() == name:
+                return i
+        return None
+
+    def record(self, change):
+        if change.get("account") in self.data.get("accounts", {}):
+            self.data["accounts"][change["account"]]
+        remember_base(self.bases, self.data, change, len(self.pending))
+        self.index.apply_change(self.data, change)
+        apply_change(self.data, change)
+        self.pending.append(encode_change(change))
+
+    def new_account(self, account_key, created=None):
+        change = new_account_change(self.data, account_key, created)
+        self.record(change)
+        return change["account"]
+
+    def update_account(self, account_key, new_key=None, **fields):
+        account = self.account(account_key)
+        protect_secrets(self.data, self.cipher, fields, account, ACCOUNT_SECRET_FIELDS)
+        for change in update_account_changes(self.data, account_key, new_key or account_key, fields):
+            self.record(change)
+
+    def delete_account(self, account_key):
+        self.account(account_key)
+        if account_key == "OTHERS":
+            raise VaultError("Cannot delete the reserved OTHERS account.")
+        self.record({"op": "delete_account", "account": account_key})
+
+    def add_service(self, account_key, fields, details=""):
+        services = self.account(account_key).setdefault("services", [])
+        service = protect_secrets(self.data, self.cipher, service_record(fields, details), None, SERVICE_SECRET_FIELDS)
+        self.record({"op": "add_service", "account": account_key, "value": service})
+        return len(services) - 1
+
+    def update_service(self, account_key, index, **fields):
+        # Fields not given keep their current values.
+        previous = self.account(account_key)["services"][index]
+        values = dict(previous)
+        values.update(fields)
+        service = protect_secrets(self.data, self.cipher, Service(values), previous, SERVICE_SECRET_FIELDS)
+        if not service.get("name"):
+            raise VaultError("Service name is required.")
+        self.record({"op": "set_service", "account": account_key, "index": index, "value": service})
+
+    def delete_service(self, account_key, index):
+        self.account(account_key)["services"][index]
+        self.record({"op": "delete_service", "account": account_key, "index": index})
+
+    def search(self, text, account_key=None, limit=GLOBAL_SEARCH_LIMIT):
+        if account_key is None:
+            self.load_all()
+        else:
+            self.account(account_key)
+        return [(key, i, get_account_record(self.data, key)["services"][i])
+                for key, i in self.index.matches(text, account_key)[:limit]]
+
+    def suggest(self, text, account_key=None):
+        if account_key is None:
+            self.load_all()
+        return [self.index.docs[doc][1].get("name", "") for doc in self.matcher.suggest(text, account_key)]
+
+    def import_file(self, path, fmt=None, default_account="OTHERS"):
+        # Everything is applied in memory, then written by one commit.
+        stats = {}
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            # Read every row before recording any, so a bad row leaves the vault untouched.
+            changes = list(import_changes(self.data, read_rows(file, transfer_format(path, fmt)),
+                                          default_account, self.cipher, stats))
+        for change in changes:
+            self.record(change)
+        self.commit(compact=True)
+        return stats
+
+    def export_file(self, path, fmt=None, reveal=False):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            return export_services(self.services(), file, transfer_format(path, fmt),
+                                   self.reveal if reveal else None)
+
+    def services(self):
+        for account_key, account in iter_accounts(self.data):
+            for service in account.get("services", []):
+                yield account_key, service
+
+    def commit(self, compact=False):
+        try:
+            self.write(compact)
+        except ExternalChange:
+            self.merge_external()
+        self.bases.clear()
+
+    def merge_external(self):
+        # Another process wrote first: merge its copy with ours and write that.
+        merged, conflicts = merge_data(self.bases, self.data, self.storage.read_external())
+        install_data(self.data, merged, self.index)
+        self.storage.save(self.data, force=True)
+        self.conflicts.extend(conflicts)
+        self.pending = []
+
+    def refresh(self):
+        # For long-lived vaults: takes in what other processes wrote since we last
+        # read or wrote, and returns the keys of the accounts that changed.
+        if self.pending or not self.storage.changed_on_disk():
+            return []
+        with self.storage.file_lock:
+            changes = self.storage.read_new_changes()
+            if changes is None:
+                changed = install_data(self.data, self.storage.read_external(), self.index)
+                self.storage.adopt()
+                return changed
+            for change in changes:
+                if change.get("account") in self.data.get("accounts", {}):
+                    self.data["accounts"][change["account"]]
+                self.index.apply_change(self.data, change)
+                apply_change(self.data, change)
+            return [key for change in changes for key in (change.get("account"), change.get("new")) if key]
+
+    def write(self, compact):
+        if compact and self.storage.snapshot_required:
+            # The snapshot holds the pending changes; no need to journal them first.
+            self.pending = []
+            self.storage.save(self.data)
+            return
+        if self.pending:
+            compact = self.storage.append(self.pending) or compact
+            self.pending = []
+        if compact:
+            if self.storage.snapshot_required:
+                self.storage.save(self.data)
+            else:
+                self.storage.checkpoint()
+
+    def close(self):
+        self.commit()
+        self.storage.close()
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote, urlsplit
+from benchmark import synthetic_vault, write_vault, version
+
+# Drives the API server (server.py) with concurrent keep-alive clients and reports
+# requests/sec and latency percentiles as JSON:
+#   python loadtest.py                                  (serves a synthetic vault itself)
+#   python loadtest.py --url http://127.0.0.1:8765 --connections 32 --requests 20000
+#   python loadtest.py --socket /path/to/vault.sock
+# A share of the requests (--write-ratio) change a service note, so readers are
+# measured while writers are being serialized and journaled. Against a vault of
+# your own, use a copy: those writes are real.
+MAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (50, 90, 99)
+SEARCHES = ("net", "hub", "spotify", "example.com", "zz")
+
+# ---------------- Client ----------------
+class Client:
+    def __init__(self, url=None, socket_path=None, token=None):
+        self.url = urlsplit(url) if url else None
+        self.socket_path = socket_path
+        self.token = token
+        self.reader = self.writer = None
+
+    async def connect(self):
+        if self.socket_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.url.hostname, self.url.port or 80)
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            await self.connect()
+        text = b"" if body is None else json.dumps(body).encode("utf-8")
+        head = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(text)}"]
+        if self.token:
+            head.append(f"Authorization: Bearer {self.token}")
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + text)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+# ---------------- Load ----------------
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else None
+
+def latency_summary(times):
+    ordered = sorted(times)
+    result = {"count": len(ordered)}
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = round(percentile(ordered, p) * 1000, 3) if ordered else None
+    result["max_ms"] = round(ordered[-1] * 1000, 3) if ordered else None
+    return result
+
+async def discover(client, sample):
+    # A sample of (account, service name) pairs to look up.
+    status, payload = await client.request("GET", "/accounts")
+    targets = []
+    for account_key in payload["accounts"][:sample]:
+        _, services = await client.request("GET", f"/accounts/{quote(account_key, safe='')}/services")
+        targets.extend((account_key, service["name"]) for service in services["services"])
+    if not targets:
+        raise SystemExit("The vault has no services to look up.")
+    return targets
+
+async def worker(client, targets, requests, write_ratio, seed, times, errors):
+    rng = random.Random(seed)
+    try:
+        while requests:
+            requests.pop()
+            account_key, name = targets[rng.randrange(len(targets))]
+            path = f"/accounts/{quote(account_key, safe='')}/services/{quote(name, safe='')}"
+            roll = rng.random()
+            if roll < write_ratio:
+                kind, request = "write", ("PATCH", path, {"note": f"load test {rng.randrange(10 ** 6)}"})
+            elif roll < write_ratio + (1 - write_ratio) / 4:
+                kind, request = "search", ("GET", f"/search?q={SEARCHES[rng.randrange(len(SEARCHES))]}&limit=20", None)
+            else:
+                kind, request = "lookup", ("GET", path, None)
+            start = time.perf_counter()
+            status, _ = await client.request(*request)
+            times[kind].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        client.close()
+
+async def load(args):
+    def client():
+        return Client(args.url, args.socket, args.token)
+    probe = client()
+    targets = await discover(probe, args.sample)
+    probe.close()
+    times = {"lookup": [], "search": [], "write": []}
+    errors = {}
+    requests = list(range(args.requests))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client(), targets, requests, args.write_ratio, n, times, errors)
+                           for n in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in times.values())
+    return {"requests": total, "connections": args.connections, "seconds": round(elapsed, 3),
+            "requests_per_sec": round(total / elapsed, 1), "errors": errors,
+            "latency": latency_summary([t for values in times.values() for t in values]),
+            "by_kind": {kind: latency_summary(values) for kind, values in times.items() if values}}
+
+def start_server(directory, args):
+    path = write_vault(synthetic_vault(args.accounts, args.services, args.depth), directory)
+    process = subprocess.Popen([sys.executable, os.path.join(MAIN_DIR, "cli.py"), "--file", path, "serve", "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if " on " not in line:
+        process.kill()
+        raise SystemExit("The server did not start.")
+    return process, line.rsplit(" on ", 1)[1].strip()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the vault API server.")
+    parser.add_argument("--url", default=None, help="a running server, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--socket", default=None, help="a running server's Unix socket")
+    parser.add_argument("--token", default=os.environ.get("VAULT_API_TOKEN"))
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--sample", type=int, default=200, help="accounts whose services are looked up")
+    parser.add_argument("--accounts", type=int, default=1000, help="size of the synthetic vault (no --url/--socket)")
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    process = directory = None
+    if not args.url and not args.socket:
+        directory = tempfile.mkdtemp(prefix="vault-load-")
+        process, args.url = start_server(directory, args)
+    try:
+        report = {"version": version(), "target": args.socket or args.url, "write_ratio": args.write_ratio}
+        report.update(asyncio.run(load(args)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
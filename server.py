@@ -0,0 +1,257 @@
+import asyncio
+import json
+import sys
+from urllib.parse import urlsplit, parse_qs, unquote
+from core import VaultError, GLOBAL_SEARCH_LIMIT
+from storage import json_default, ExternalChange, ACCOUNT_SECRET_FIELDS, SERVICE_SECRET_FIELDS
+
+# A JSON API over one open Vault for scripts that look up credentials, started by
+#   python cli.py serve --port 8765            (or --socket /path/to/vault.sock)
+#   curl localhost:8765/accounts/user@mail.com/services/Netflix
+#   curl "localhost:8765/search?q=netf"
+# The data is loaded once and the search index stays warm. Requests are handled
+# on one event loop, so readers never wait for each other. Writers take turns:
+# each applies its change in memory and is answered once the Vault has journaled
+# it (in a worker thread, so readers keep being served) or merged it with what
+# another program wrote, the same path cli.py commits through.
+#
+# Routes (service names are matched case-insensitively, like cli.py):
+#   GET    /accounts                          POST /accounts {"account": ...}
+#   GET    /accounts/<key>                    PATCH/DELETE /accounts/<key>
+#   GET    /accounts/<key>/services           POST /accounts/<key>/services {fields}
+#   GET    /accounts/<key>/services/<name>    PATCH/DELETE /accounts/<key>/services/<name>
+#   GET    /search?q=<text>[&account=<key>][&limit=<n>]
+#   GET    /suggest?q=<text>[&account=<key>]
+DEFAULT_PORT = 8765
+WATCH_INTERVAL = 1.0       # Seconds between checks for changes other programs made.
+MAX_BODY = 16 * 1024 * 1024
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def require_account(vault, account_key):
+    if not vault.has_account(account_key):
+        raise HttpError(404, f"No account {account_key!r}.")
+    return vault.account(account_key)
+
+def require_service(vault, account_key, name):
+    require_account(vault, account_key)
+    index = vault.find_service(account_key, name)
+    if index is None:
+        raise HttpError(404, f"No service {name!r} in {account_key!r}.")
+    return index
+
+def summary(account_key, index, service):
+    return {"account": account_key, "index": index, "name": service.get("name", ""),
+            "username": service.get("username", ""), "email": service.get("email", ""), "url": service.get("url", "")}
+
+# ---------------- Handlers ----------------
+# Called as handler(vault, query, body, *path_arguments); the result is sent as JSON.
+def list_accounts(vault, query, body):
+    return {"accounts": vault.keys()}
+
+def get_account(vault, query, body, account_key):
+    account = vault.revealed(require_account(vault, account_key), ACCOUNT_SECRET_FIELDS)
+    account["services"] = [vault.revealed(service, SERVICE_SECRET_FIELDS) for service in account.get("services", [])]
+    return account
+
+def list_services(vault, query, body, account_key):
+    services = require_account(vault, account_key).get("services", [])
+    return {"services": [summary(account_key, i, service) for i, service in enumerate(services)]}
+
+def get_service(vault, query, body, account_key, name):
+    index = require_service(vault, account_key, name)
+    return vault.revealed(vault.account(account_key)["services"][index], SERVICE_SECRET_FIELDS)
+
+def search(vault, query, body):
+    try:
+        limit = int(query.get("limit", GLOBAL_SEARCH_LIMIT))
+    except ValueError:
+        raise HttpError(400, "limit must be a number.") from None
+    account_key = query.get("account")
+    if account_key is not None:
+        require_account(vault, account_key)
+    return {"results": [summary(key, i, service) for key, i, service in vault.search(query.get("q", ""), account_key, limit)]}
+
+def suggest(vault, query, body):
+    return {"suggestions": vault.suggest(query.get("q", ""), query.get("account"))}
+
+def create_account(vault, query, body):
+    if not isinstance(body.get("account"), str):
+        raise HttpError(400, "Expected {\"account\": \"<key>\"}.")
+    return {"account": vault.new_account(body["account"], body.get("dateCreated"))}
+
+def update_account(vault, query, body, account_key):
+    require_account(vault, account_key)
+    if "services" in body:
+        raise HttpError(400, "Services are changed through /accounts/<key>/services.")
+    new_key = body.pop("new_key", None)
+    vault.update_account(account_key, new_key, **body)
+    return {"account": new_key or account_key}
+
+def delete_account(vault, query, body, account_key):
+    require_account(vault, account_key)
+    vault.delete_account(account_key)
+    return {"deleted": account_key}
+
+def create_service(vault, query, body, account_key):
+    require_account(vault, account_key)
+    if vault.find_service(account_key, str(body.get("name", ""))) is not None:
+        raise HttpError(409, f"{account_key!r} already has a service named {body['name']!r}.")
+    details = body.pop("details", "")
+    index = vault.add_service(account_key, body, details)
+    return summary(account_key, index, vault.account(account_key)["services"][index])
+
+def update_service(vault, query, body, account_key, name):
+    index = require_service(vault, account_key, name)
+    vault.update_service(account_key, index, **body)
+    return summary(account_key, index, vault.account(account_key)["services"][index])
+
+def delete_service(vault, query, body, account_key, name):
+    vault.delete_service(account_key, require_service(vault, account_key, name))
+    return {"deleted": name}
+
+# (method, path shape) -> (handler, writes). In a shape every other segment,
+# starting with the second, is a path argument.
+ROUTES = {
+    ("GET", ("accounts",)): (list_accounts, False),
+    ("POST", ("accounts",)): (create_account, True),
+    ("GET", ("accounts", "*")): (get_account, False),
+    ("PATCH", ("accounts", "*")): (update_account, True),
+    ("DELETE", ("accounts", "*")): (delete_account, True),
+    ("GET", ("accounts", "*", "services")): (list_services, False),
+    ("POST", ("accounts", "*", "services")): (create_service, True),
+    ("GET", ("accounts", "*", "services", "*")): (get_service, False),
+    ("PATCH", ("accounts", "*", "services", "*")): (update_service, True),
+    ("DELETE", ("accounts", "*", "services", "*")): (delete_service, True),
+    ("GET", ("search",)): (search, False),
+    ("GET", ("suggest",)): (suggest, False),
+}
+PATH_SHAPES = {shape for _, shape in ROUTES}
+
+# ---------------- Server ----------------
+class VaultServer:
+    def __init__(self, vault, token=None):
+        self.vault = vault
+        self.token = token
+        self.writer = asyncio.Lock()
+
+    async def write(self, handler, *args):
+        async with self.writer:
+            try:
+                result = handler(self.vault, *args)
+            finally:
+                # Whatever was recorded before a failure is committed too.
+                try:
+                    await asyncio.to_thread(self.vault.write, False)
+                except ExternalChange:
+                    self.vault.merge_external()
+                self.vault.bases.clear()
+            self.report_conflicts()
+            return result
+
+    def report_conflicts(self):
+        for note in self.vault.conflicts:
+            print(f"merged with another writer: {note}", file=sys.stderr)
+        self.vault.conflicts.clear()
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            async with self.writer:
+                try:
+                    self.vault.refresh()
+                except (OSError, ValueError) as e:
+                    print(f"error reading changes made by another program: {e}", file=sys.stderr)
+
+    async def respond(self, method, target, headers, body):
+        if self.token is not None and headers.get("authorization") != f"Bearer {self.token}":
+            raise HttpError(401, "Missing or wrong token.")
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        shape = tuple(part if i % 2 == 0 else "*" for i, part in enumerate(parts))
+        route = ROUTES.get((method, shape))
+        if route is None:
+            raise HttpError(405 if shape in PATH_SHAPES else 404, f"No route for {method} {url.path}.")
+        handler, writes = route
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body = json.loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400, "The body is not valid JSON.") from None
+        if not isinstance(body, dict):
+            raise HttpError(400, "The body must be a JSON object.")
+        if writes:
+            return (201 if method == "POST" else 200), await self.write(handler, query, body, *parts[1::2])
+        return 200, handler(self.vault, query, body, *parts[1::2])
+
+    async def serve_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive; one request at a time per connection.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target = request_line.decode("latin-1").split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                close = headers.get("connection", "").lower() == "close"
+                try:
+                    if length > MAX_BODY:
+                        close = True
+                        raise HttpError(413, f"Bodies are limited to {MAX_BODY} bytes.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.respond(method.upper(), target, headers, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (VaultError, TypeError, KeyError, IndexError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    print(f"error handling {method} {target}: {e!r}", file=sys.stderr)
+                    status, payload = 500, {"error": "Internal error."}
+                text = json.dumps(payload, default=json_default).encode("utf-8")
+                head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                        f"Content-Length: {len(text)}"]
+                if close:
+                    head.append("Connection: close")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + text)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+        if socket_path:
+            server = await asyncio.start_unix_server(self.serve_connection, socket_path)
+            where = socket_path
+        else:
+            server = await asyncio.start_server(self.serve_connection, host, port)
+            where = "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        # One line on stdout so a parent process (loadtest.py) can find the port.
+        print(f"Serving {self.vault.storage.filename} on {where}", flush=True)
+        watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+def serve(vault, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, token=None):
+    vault.load_all()
+    try:
+        asyncio.run(VaultServer(vault, token).run(host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
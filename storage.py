@@ -0,0 +1,1559 @@
+import json
+import os
+import time
+import base64
+import re
+import codecs
+import sys
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+import weakref
+from collections.abc import Mapping, MutableMapping
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ---------------- Data Model Helpers ----------------
+def empty_data():
+    return {"accounts": {}, "OTHERS": {}}
+
+def get_account_record(data, account_key):
+    if account_key == "OTHERS":
+        return data.setdefault("OTHERS", {})
+    return data["accounts"][account_key]
+
+def iter_accounts(data):
+    yield from data.get("accounts", {}).items()
+    if "OTHERS" in data:
+        yield "OTHERS", data["OTHERS"]
+
+def iter_loaded_accounts(data):
+    # Like iter_accounts, but never forces a lazily loaded account in.
+    accounts = data.get("accounts", {})
+    yield from (accounts.loaded_items() if isinstance(accounts, LazyAccounts) else accounts.items())
+    if "OTHERS" in data:
+        yield "OTHERS", data["OTHERS"]
+
+# ---------------- Service Records ----------------
+# Services are the bulk of a vault, so they are kept as Service records: one slot
+# per known field instead of a dict each. The key order is an interned tuple
+# shared by every service with the same layout, and unknown keys go to `extra`,
+# so a record iterates, compares and serializes exactly like the dict it replaces.
+SERVICE_FIELDS = ("name", "username", "email", "link", "webpage", "url", "password", "PIN", "phone",
+                  "dateCreated", "sign_in_with", "note", "details")
+SERVICE_FIELD_SET = frozenset(SERVICE_FIELDS)
+service_orders = {}
+
+def intern_order(order):
+    return service_orders.setdefault(order, order)
+
+class Service(MutableMapping):
+    __slots__ = SERVICE_FIELDS + ("order", "extra")
+
+    def __init__(self, values=()):
+        self.extra = None
+        order = []
+        for key, value in (values.items() if isinstance(values, Mapping) else values):
+            if key in SERVICE_FIELD_SET:
+                setattr(self, key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+            if key not in order:
+                order.append(key)
+        self.order = intern_order(tuple(order))
+
+    def __getitem__(self, key):
+        if key in SERVICE_FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        if key not in self.order:
+            self.order = intern_order(self.order + (key,))
+        if key in SERVICE_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self.order:
+            raise KeyError(key)
+        self.order = intern_order(tuple(k for k in self.order if k != key))
+        if key in SERVICE_FIELD_SET:
+            delattr(self, key)
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, key):
+        return key in self.order
+
+    def copy(self):
+        return Service(self)
+
+    def __repr__(self):
+        return f"Service({dict(self)!r})"
+
+def compact_account(account, blobs=None):
+    services = account.get("services") if isinstance(account, dict) else None
+    if isinstance(services, list):
+        services[:] = [Service(service) if type(service) is dict else service for service in services]
+        if blobs is not None:
+            for service in services:
+                if isinstance(service, Service):
+                    blobs.attach(service)
+    return account
+
+def compact_data(data, blobs=None):
+    for _, account in iter_loaded_accounts(data):
+        compact_account(account, blobs)
+    return data
+
+def decode_change(line):
+    # Journal values get the same in-memory layout as loaded services.
+    change = json.loads(line)
+    if change.get("op") in ("add_service", "set_service") and type(change.get("value")) is dict:
+        change["value"] = Service(change["value"])
+    elif change.get("op") == "put_account":
+        compact_account(change.get("value"))
+    return change
+
+def service_memory(filename=None, count=100000):
+    # Bytes allocated for the service containers in each layout; both share the
+    # same value strings, so the difference is the per-record overhead.
+    if filename:
+        with open(filename, "rb") as file:
+            source = json.load(file)
+        services = [service for _, account in iter_accounts(source)
+                    for service in account.get("services", []) if isinstance(service, dict)]
+    else:
+        services = [{field: f"{field}-{n}" if field in ("name", "username", "url") else "" for field in SERVICE_FIELDS}
+                    for n in range(count)]
+    sizes = {}
+    for label, build in (("dict", dict), ("Service", Service)):
+        tracemalloc.start()
+        built = [build(service) for service in services]
+        sizes[label] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del built
+    return len(services), sizes
+
+# ---------------- Field Encryption ----------------
+# Optional; needs the `cryptography` package. Secret fields are stored as
+# "enc:v1:<base64 of nonce + AES-GCM ciphertext>" strings, so the journal and both
+# backends keep handling them as ordinary strings and saves do no crypto at all.
+# The key is derived from the passphrase once per session with scrypt;
+# data["encryption"] holds the salt, the KDF parameters and a check token.
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.exceptions import InvalidTag
+except ImportError:
+    AESGCM = None
+    InvalidTag = ValueError
+
+ENCRYPTED_PREFIX = "enc:v1:"
+ACCOUNT_SECRET_FIELDS = ("password",)
+SERVICE_SECRET_FIELDS = ("password", "PIN")
+KDF_SETTINGS = {"kdf": "scrypt", "n": 2 ** 15, "r": 8, "p": 1}
+CIPHER_CACHE_LIMIT = 10000
+
+def is_encrypted(value):
+    return isinstance(value, str) and value.startswith(ENCRYPTED_PREFIX)
+
+def derive_key(passphrase, settings):
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=base64.b64decode(settings["salt"]),
+                          n=settings["n"], r=settings["r"], p=settings["p"],
+                          maxmem=256 * settings["n"] * settings["r"] * settings["p"], dklen=32)
+
+class FieldCipher:
+    def __init__(self, key):
+        if AESGCM is None:
+            raise RuntimeError("Encrypting passwords needs the 'cryptography' package (pip install cryptography).")
+        self.aead = AESGCM(key)
+        self.plain = {}            # token -> plaintext, so showing or re-saving a field decrypts it once.
+
+    @classmethod
+    def create(cls, passphrase):
+        settings = dict(KDF_SETTINGS, salt=base64.b64encode(os.urandom(16)).decode("ascii"))
+        cipher = cls(derive_key(passphrase, settings))
+        settings["check"] = cipher.encrypt("check")
+        return cipher, settings
+
+    @classmethod
+    def unlock(cls, passphrase, settings):
+        cipher = cls(derive_key(passphrase, settings))
+        cipher.decrypt(settings["check"])
+        return cipher
+
+    def remember(self, token, text):
+        if len(self.plain) >= CIPHER_CACHE_LIMIT:
+            self.plain.clear()
+        self.plain[token] = text
+
+    def encrypt(self, text):
+        nonce = os.urandom(12)
+        blob = nonce + self.aead.encrypt(nonce, text.encode("utf-8"), None)
+        token = ENCRYPTED_PREFIX + base64.b64encode(blob).decode("ascii")
+        self.remember(token, text)
+        return token
+
+    def decrypt(self, value):
+        if not is_encrypted(value):
+            return value
+        text = self.plain.get(value)
+        if text is None:
+            try:
+                blob = base64.b64decode(value[len(ENCRYPTED_PREFIX):])
+                text = self.aead.decrypt(blob[:12], blob[12:], None).decode("utf-8")
+            except (InvalidTag, ValueError) as e:
+                raise ValueError("Wrong passphrase or damaged field.") from e
+            self.remember(value, text)
+        return text
+
+    def protect(self, text, previous=None):
+        # An unchanged value keeps its stored token, so an edit re-encrypts only the
+        # fields that actually changed.
+        if not text or is_encrypted(text) or text == previous:
+            return text
+        if is_encrypted(previous):
+            try:
+                if self.decrypt(previous) == text:
+                    return previous
+            except ValueError:
+                pass
+        return self.encrypt(text)
+
+    def encrypt_record(self, record, fields):
+        count = 0
+        for field in fields:
+            value = record.get(field)
+            if isinstance(value, str) and value and not is_encrypted(value):
+                record[field] = self.encrypt(value)
+                count += 1
+        return count
+
+def encrypt_data(data, cipher):
+    # One pass over every account (lazy ones are loaded), encrypting plaintext secrets in place.
+    count = 0
+    for _, account in iter_accounts(data):
+        if not isinstance(account, dict):
+            continue
+        count += cipher.encrypt_record(account, ACCOUNT_SECRET_FIELDS)
+        for service in account.get("services", []):
+            if isinstance(service, Mapping):
+                count += cipher.encrypt_record(service, SERVICE_SECRET_FIELDS)
+    return count
+
+def crypto_benchmark(count=10000):
+    timings = {}
+    start = time.perf_counter()
+    cipher, settings = FieldCipher.create("benchmark")
+    timings["create (ms)"] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    FieldCipher.unlock("benchmark", settings)
+    timings["unlock (ms)"] = (time.perf_counter() - start) * 1000
+    values = [f"password-{n}" for n in range(count)]
+    start = time.perf_counter()
+    tokens = [cipher.encrypt(value) for value in values]
+    timings["encrypt (us/field)"] = (time.perf_counter() - start) / count * 1e6
+    cipher.plain.clear()
+    start = time.perf_counter()
+    for token in tokens:
+        cipher.decrypt(token)
+    timings["decrypt (us/field)"] = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for value, token in zip(values, tokens):
+        cipher.protect(value, token)
+    timings["unchanged field on save (us/field)"] = (time.perf_counter() - start) / count * 1e6
+    return timings
+
+def account_keys(data):
+    keys = list(data.get("accounts", {}))
+    if "OTHERS" in data:
+        keys.append("OTHERS")
+    return keys
+
+# In fast-start mode data["accounts"] is a LazyAccounts: the keys (in order) are
+# known up front and each account body is read from the backend the first time it
+# is looked up. `on_load` is called on the thread that triggered the load.
+NOT_LOADED = object()
+
+class LazyAccounts(MutableMapping):
+    def __init__(self, keys, loader):
+        self.values = dict.fromkeys(keys, NOT_LOADED)
+        self.loader = loader
+        self.on_load = None
+        self.lock = threading.RLock()
+
+    def __getitem__(self, key):
+        value = self.values[key]
+        if value is NOT_LOADED:
+            value = self.install(key, self.loader(key))
+        return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.values[key] = value
+
+    def __delitem__(self, key):
+        with self.lock:
+            del self.values[key]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def is_loaded(self, key):
+        return self.values.get(key, NOT_LOADED) is not NOT_LOADED
+
+    def unloaded_keys(self):
+        return [key for key, value in list(self.values.items()) if value is NOT_LOADED]
+
+    def loaded_items(self):
+        return [(key, value) for key, value in list(self.values.items()) if value is not NOT_LOADED]
+
+    def install(self, key, value):
+        # Used for on-demand loads and for accounts prefetched by another thread; a
+        # key that was changed or removed in the meantime is left alone.
+        with self.lock:
+            if self.values.get(key, None) is not NOT_LOADED:
+                return self.values.get(key)
+            self.values[key] = value
+        if self.on_load is not None:
+            self.on_load(key, value)
+        return value
+
+# Every CRUD action is described by one change record. The same records are
+# applied to the in-memory `data`, appended to the JSON journal, and turned into
+# row-level statements by the SQLite backend.
+def apply_change(data, change):
+    op = change["op"]
+    account_key = change.get("account")
+    if op == "put_account":
+        data["accounts"][account_key] = change["value"]
+    elif op == "update_account":
+        get_account_record(data, account_key).update(change["fields"])
+    elif op == "rename_account":
+        data["accounts"][change["new"]] = data["accounts"].pop(account_key)
+    elif op == "delete_account":
+        data["accounts"].pop(account_key, None)
+    elif op == "add_service":
+        services = get_account_record(data, account_key).setdefault("services", [])
+        services.insert(change.get("index", len(services)), change["value"])
+    elif op == "set_service":
+        get_account_record(data, account_key)["services"][change["index"]] = change["value"]
+    elif op == "delete_service":
+        get_account_record(data, account_key)["services"].pop(change["index"])
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+def invert_change(data, change):
+    # The change that undoes `change`; call it before the change is applied. The old
+    # values are kept by reference: edits replace services and accounts rather than
+    # changing them, so nothing needs copying. A renamed or re-created account comes
+    # back at the end of the list, like any account that is put.
+    op = change["op"]
+    account_key = change.get("account")
+    account = data.get("OTHERS") if account_key == "OTHERS" else data.get("accounts", {}).get(account_key)
+    if op in ("put_account", "delete_account"):
+        if account is None:
+            return {"op": "delete_account", "account": account_key}
+        return {"op": "put_account", "account": account_key, "value": account}
+    if op == "update_account":
+        if account is None:
+            # OTHERS is created by its first change and then stays.
+            return {"op": "update_account", "account": account_key, "fields": {}}
+        if all(field in account for field in change["fields"]) or account_key == "OTHERS":
+            return {"op": "update_account", "account": account_key,
+                    "fields": {field: account.get(field, "") for field in change["fields"]}}
+        return {"op": "put_account", "account": account_key,
+                "value": dict(account, services=list(account.get("services", [])))}
+    if op == "rename_account":
+        return {"op": "rename_account", "account": change["new"], "new": account_key}
+    if op == "add_service":
+        services = account.get("services", []) if account is not None else []
+        return {"op": "delete_service", "account": account_key, "index": change.get("index", len(services))}
+    if op == "set_service":
+        return {"op": "set_service", "account": account_key, "index": change["index"],
+                "value": account["services"][change["index"]]}
+    if op == "delete_service":
+        return {"op": "add_service", "account": account_key, "index": change["index"],
+                "value": account["services"][change["index"]]}
+    raise ValueError(f"Unknown journal operation: {op}")
+
+def encode_change(change):
+    return json.dumps(change, separators=(",", ":"), default=json_default) + "\n"
+
+# ---------------- Streaming Parser ----------------
+# Parses a data.json one account at a time instead of building the whole document
+# at once. Large service "details" payloads can be kept as RawJson, the undecoded
+# JSON text, and only decoded when something displays them.
+STREAM_CHUNK = 1024 * 1024
+RAW_DETAILS_MIN = 256      # Smaller details are cheaper to keep decoded.
+JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]"]')
+
+class RawJson:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def decode(self):
+        return json.loads(self.text)
+
+    def __eq__(self, other):
+        return self.decode() == (other.decode() if isinstance(other, RawJson) else other)
+
+def resolve_raw(value):
+    return value.decode() if isinstance(value, RawJson) else value
+
+def json_default(value):
+    if isinstance(value, RawJson):
+        return value.decode()
+    if isinstance(value, Service):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class JsonStream:
+    def __init__(self, file, hasher=None, blobs=None):
+        self.file = file
+        self.blobs = blobs
+        self.hasher = hasher
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.file.read(STREAM_CHUNK)
+        if self.hasher is not None and chunk:
+            self.hasher.update(chunk)
+        self.eof = not chunk
+        self.buf += self.text.decode(chunk, final=self.eof)
+        return bool(chunk)
+
+    def release(self):
+        # Drop what has been parsed; only called between values so no offsets are held.
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {ch!r}")
+        self.pos += 1
+        return ch
+
+    def skip(self):
+        # Returns the text of the next value, found by matching brackets.
+        ch = self.peek()
+        start = scan = self.pos
+        if ch not in ("{", "["):
+            while True:
+                try:
+                    _, end = self.decoder.raw_decode(self.buf, start)
+                    # A number may continue in the next chunk.
+                    if end < len(self.buf) or self.eof:
+                        self.pos = end
+                        return self.buf[start:end]
+                except json.JSONDecodeError:
+                    if self.eof:
+                        raise
+                self.fill()
+        depth = 0
+        while True:
+            for match in JSON_TOKEN.finditer(self.buf, scan):
+                token = match.group()
+                if token == '"':
+                    # A string cut off by the end of the buffer; rescan it after a refill.
+                    scan = match.start()
+                    break
+                if token in "{[":
+                    depth += 1
+                elif token in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        self.pos = match.end()
+                        return self.buf[start:self.pos]
+                scan = match.end()
+            else:
+                scan = len(self.buf)
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def value(self):
+        return json.loads(self.skip())
+
+    def members(self):
+        # Yields the keys of an object; the caller consumes each value.
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = json.loads(self.skip())
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def service(self, raw_details):
+        service = {}
+        for key in self.members():
+            if key == "details" and raw_details and self.peek() in ("{", "["):
+                text = self.skip()
+                service[key] = RawJson(text) if len(text) >= RAW_DETAILS_MIN else json.loads(text)
+            else:
+                service[key] = self.value()
+        service = Service(service)
+        if self.blobs is not None:
+            self.blobs.attach(service)
+        return service
+
+    def account(self, raw_details):
+        if self.peek() != "{":
+            return self.value()
+        account = {}
+        for key in self.members():
+            if key == "services" and self.peek() == "[":
+                services = account[key] = []
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                    continue
+                while True:
+                    services.append(self.service(raw_details) if self.peek() == "{" else self.value())
+                    if self.expect(",]") == "]":
+                        break
+            else:
+                account[key] = self.value()
+        return account
+
+def stream_data(file, on_account=None, raw_details=True, hasher=None, blobs=None):
+    # Builds `data` from a binary file object, calling on_account(key, account) for
+    # every account (and OTHERS) as soon as it has been parsed.
+    stream = JsonStream(file, hasher, blobs)
+    data = {}
+    for key in stream.members():
+        if key == "accounts" and stream.peek() == "{":
+            accounts = data["accounts"] = {}
+            for account_key in stream.members():
+                accounts[account_key] = stream.account(raw_details)
+                if on_account is not None:
+                    on_account(account_key, accounts[account_key])
+                stream.release()
+        elif key == "OTHERS":
+            data[key] = stream.account(raw_details)
+            if on_account is not None and isinstance(data[key], dict):
+                on_account(key, data[key])
+        else:
+            data[key] = stream.value()
+        stream.release()
+    if stream.peek():
+        raise ValueError("Extra data after the end of the JSON document")
+    return data
+
+# ---------------- Atomic File Writes ----------------
+# Snapshots are written to a temp file, fsynced and renamed over the target, so a
+# crash leaves either the old or the new file intact. The previous
+# SNAPSHOT_GENERATIONS snapshots are kept as data.json.1, data.json.2, ...
+SNAPSHOT_GENERATIONS = 3
+
+def generation_file(filename, generation):
+    return filename if generation == 0 else f"{filename}.{generation}"
+
+def fsync_directory(directory):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_file_atomic(raw, filename, rotate=True):
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(raw)
+            file.flush()
+            os.fsync(file.fileno())
+        if rotate:
+            for generation in range(SNAPSHOT_GENERATIONS, 0, -1):
+                older = generation_file(filename, generation - 1)
+                if os.path.exists(older):
+                    os.replace(older, generation_file(filename, generation))
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(directory)
+
+# ---------------- Blob Store ----------------
+# Large service "details" are kept once per distinct payload in data.json.blobs/,
+# named by the SHA-256 of their compact JSON text; the snapshot holds
+# {"$blob": "<digest>"} in their place. Loaded references become BlobRef, which
+# reads the payload only when something displays or exports it. The journal keeps
+# details inline; they move into the store when the snapshot is next written.
+# After each snapshot, blobs are deleted unless it, an older generation or a
+# BlobRef still alive in this process (undo history, merge bases) refers to them,
+# or they are younger than BLOB_GC_GRACE: another process may have just stored
+# them for a snapshot it is about to write.
+BLOB_MIN_BYTES = 1024
+BLOB_GC_GRACE = 3600       # Seconds.
+BLOB_KEY = "$blob"
+BLOB_REFERENCE = re.compile(rb'"\$blob": *"([0-9a-f]{64})"')
+BLOB_NAME = re.compile(r"[0-9a-f]{64}")
+live_blobs = weakref.WeakValueDictionary()     # id -> every BlobRef alive in this process.
+
+def blob_digest(text):
+    return hashlib.sha256(text.encode("ascii")).hexdigest()
+
+def blob_text(details):
+    # The compact JSON a payload is stored as, or None when it stays inline.
+    if isinstance(details, (dict, list)) or (type(details) is RawJson and len(details.text) >= BLOB_MIN_BYTES):
+        text = json.dumps(resolve_raw(details), separators=(",", ":"), default=json_default)
+        if len(text) >= BLOB_MIN_BYTES:
+            return text
+    return None
+
+def digest_default(value):
+    # json.dumps default= for comparing data: details that are (or would be) in the
+    # blob store compare by digest, without reading the store.
+    if isinstance(value, BlobRef):
+        return {BLOB_KEY: value.digest}
+    if isinstance(value, Service):
+        record = dict(value)
+        text = blob_text(record.get("details"))
+        if text is not None:
+            record["details"] = {BLOB_KEY: blob_digest(text)}
+        return record
+    return json_default(value)
+
+class BlobRef(RawJson):
+    __slots__ = ("store", "digest", "__weakref__")
+
+    def __init__(self, store, digest):
+        self.store = store
+        self.digest = digest
+        live_blobs[id(self)] = self
+
+    @property
+    def text(self):
+        return self.store.read(self.digest)
+
+    def __eq__(self, other):
+        if isinstance(other, BlobRef) and other.digest == self.digest:
+            return True
+        return super().__eq__(other)
+
+class BlobStore:
+    def __init__(self, directory):
+        self.directory = directory
+        # Details found too small for the store by the previous and the current
+        # snapshot, by id (held, so the ids stay theirs). Details are replaced, never
+        # changed in place, so they are not serialized again just to be measured.
+        self.small = {}
+        self.still_small = {}
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def read(self, digest):
+        with open(self.path(digest), "r", encoding="ascii") as file:
+            return file.read()
+
+    def put(self, text):
+        digest = blob_digest(text)
+        path = self.path(digest)
+        if os.path.exists(path):
+            # Restart its grace period; a collection in another process may not see our reference yet.
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_file_atomic(text.encode("ascii"), path, rotate=False)
+        return digest
+
+    def attach(self, service):
+        # Turns a loaded {"$blob": digest} reference into a BlobRef.
+        details = service.get("details")
+        if type(details) is dict and len(details) == 1 and isinstance(details.get(BLOB_KEY), str):
+            service["details"] = BlobRef(self, details[BLOB_KEY])
+
+    def externalize(self, service):
+        # The service as a snapshot stores it. Large details are moved into the store
+        # and replaced in memory too, so later snapshots only write the reference.
+        details = service.get("details")
+        if self.small.get(id(details)) is details:
+            self.still_small[id(details)] = details
+        elif isinstance(details, (dict, list, RawJson)) and not isinstance(details, BlobRef):
+            text = blob_text(details)
+            if text is not None:
+                service["details"] = BlobRef(self, self.put(text))
+            else:
+                self.still_small[id(details)] = details
+        return dict(service)
+
+    def snapshot_done(self):
+        self.small, self.still_small = self.still_small, {}
+
+    def default(self, value):
+        # json.dumps default= for snapshots.
+        if isinstance(value, BlobRef):
+            return {BLOB_KEY: value.digest}
+        if isinstance(value, Service):
+            return self.externalize(value)
+        return json_default(value)
+
+    def stored(self):
+        try:
+            shards = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for shard in shards:
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    yield entry
+
+    def check(self, referenced):
+        # A snapshot must never refer to a blob that is gone.
+        missing = set(referenced).difference(entry.name for entry in self.stored())
+        if missing:
+            raise ValueError(f"Details are missing from {self.directory}: {', '.join(sorted(missing))}")
+
+    def collect(self, referenced, older=()):
+        # Deletes the blobs no snapshot refers to: `referenced` holds the digests in the
+        # new snapshot, `older` the paths of the generations kept next to it.
+        cutoff = time.time() - BLOB_GC_GRACE
+        # valuerefs() copies in one step, so a saver thread may collect while others load.
+        alive = (ref() for ref in live_blobs.valuerefs())
+        referenced = set(referenced).union(blob.digest for blob in alive if blob is not None)
+        unused = [entry for entry in self.stored()
+                  if entry.name not in referenced and entry.stat().st_mtime < cutoff]
+        if not unused:
+            return 0
+        kept = set()
+        for path in older:
+            try:
+                with open(path, "rb") as file:
+                    kept.update(digest.decode("ascii") for digest in BLOB_REFERENCE.findall(file.read()))
+            except OSError:
+                continue
+        removed = 0
+        for entry in unused:
+            # Leftover temp files from an interrupted write go too.
+            if entry.name not in kept and (BLOB_NAME.fullmatch(entry.name) or entry.name.startswith(".tmp-")):
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+# ---------------- Multi-Process Access ----------------
+# Several app instances (or cli.py runs) may share one data file. Reads and writes
+# of the files happen under an advisory lock on data.json.lock, and each storage
+# remembers the on-disk state it last saw. A write that finds the files changed by
+# someone else raises ExternalChange instead of overwriting them; the caller
+# merges (core.merge_data) and writes the result with force=True.
+class ExternalChange(Exception):
+    pass
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+def file_digest(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+if fcntl is not None:
+    def lock_file(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+    def unlock_file(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+else:
+    def lock_file(file):
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass    # LK_LOCK gives up after 10 seconds; keep waiting.
+
+    def unlock_file(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    # Reentrant: the file is locked by the outermost `with` of the thread holding
+    # `lock` (the storage's RLock), so nested sections do not lock it twice.
+    def __init__(self, path, lock):
+        self.path = path
+        self.lock = lock
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            if self.depth == 0:
+                file = open(self.path, "a+b")
+                try:
+                    lock_file(file)
+                except BaseException:
+                    file.close()
+                    raise
+                self.file = file
+        except BaseException:
+            self.lock.release()
+            raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            try:
+                unlock_file(self.file)
+            finally:
+                self.file.close()
+                self.file = None
+        self.lock.release()
+
+# ---------------- Storage Backends ----------------
+# load() returns the whole `data` dict, append() persists a batch of encoded
+# change lines and returns True when the backend would like a compaction, and
+# save() writes a complete copy of `data`. Recoverable problems found while
+# loading are collected in `warnings` for the UI to show. changed_on_disk() tells
+# whether another process wrote since we last read or wrote; read_new_changes()
+# returns just the changes it appended when that is possible (None otherwise),
+# and read_external() the complete data on disk, which adopt() then accepts as
+# the new base for our writes.
+class Storage:
+    snapshot_required = False      # True when compaction means re-serializing all of `data`.
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.warnings = []
+        self.lock = threading.RLock()
+        self.file_lock = self.lock
+
+    def load(self, lazy=False):
+        raise NotImplementedError
+
+    def can_load_lazily(self):
+        return True
+
+    def load_account(self, account_key):
+        raise NotImplementedError
+
+    def append(self, lines):
+        raise NotImplementedError
+
+    def save(self, data, force=False):
+        raise NotImplementedError
+
+    def changed_on_disk(self):
+        return False
+
+    def read_new_changes(self):
+        return None
+
+    def read_external(self):
+        return self.load()
+
+    def adopt(self):
+        pass
+
+    def checkpoint(self):
+        pass
+
+    def close(self):
+        pass
+
+# Every change is appended to a JSON-lines journal next to the data file instead
+# of rewriting the whole vault. The journal is folded back into a snapshot when it
+# grows past JOURNAL_MAX_BYTES or when a compaction is requested. The first
+# journal line records the digest of the snapshot it applies to, so a journal left
+# behind by an interrupted compaction is never replayed twice.
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+class JsonStorage(Storage):
+    snapshot_required = True
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.journal = filename + ".journal"
+        self.index_file = filename + ".index"
+        self.blobs = BlobStore(filename + ".blobs")
+        self.digest = None         # sha1 of the snapshot the journal builds on.
+        self.spans = {}            # account key -> (start, end) byte span in the current snapshot.
+        self.file_lock = FileLock(filename + ".lock", self.lock)
+        self.seen = None           # (snapshot stamp, journal size) as we last read or wrote them.
+        self.external = None
+
+    def read_snapshot(self):
+        errors = []
+        for generation in range(SNAPSHOT_GENERATIONS + 1):
+            path = generation_file(self.filename, generation)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "rb") as file:
+                    raw = file.read()
+                snapshot = compact_data(json.loads(raw), self.blobs)
+            except Exception as e:
+                errors.append(f"{path}: {e}")
+                continue
+            if generation:
+                # Put the good generation back in place without re-serializing anything.
+                if os.path.exists(self.filename):
+                    os.replace(self.filename, self.filename + ".corrupt")
+                write_file_atomic(raw, self.filename, rotate=False)
+                self.warnings.append(f"{self.filename} was unreadable; restored it from {path}.\n\n" + "\n".join(errors))
+            return raw, snapshot
+        if errors:
+            raise ValueError("\n".join(errors))
+        return None, empty_data()
+
+    def replay_journal(self, data, before_change=None):
+        if not os.path.exists(self.journal):
+            return 0
+        replayed = 0
+        with open(self.journal, "rb+") as file:
+            try:
+                base = json.loads(file.readline()).get("base")
+            except Exception:
+                base = False
+            if base == self.digest:
+                good = file.tell()
+                for line in iter(file.readline, b""):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        change = decode_change(line)
+                    except Exception:
+                        if file.read(1):
+                            self.set_aside_journal(file, good, "an unreadable line")
+                            break
+                        # A torn final line from a crash mid-append; everything before it is
+                        # intact. Cut it off, or the next append would be glued onto it.
+                        self.truncate_journal(file, good)
+                        break
+                    try:
+                        if before_change is not None:
+                            before_change(data, change)
+                        apply_change(data, change)
+                    except Exception as e:
+                        self.set_aside_journal(file, good, f"a change that cannot be applied ({e!r})")
+                        break
+                    replayed += 1
+                    good = file.tell()
+                return replayed
+        # Written against another snapshot (an interrupted compaction, or a generation we
+        # had to fall back from). Keep it for manual recovery, but never append to it.
+        os.replace(self.journal, self.journal + ".stale")
+        self.warnings.append(f"The recent changes in {self.journal} were recorded against another copy of "
+                             f"{self.filename} and were not applied. If edits are missing, they were set aside "
+                             f"in {self.journal}.stale.")
+        return 0
+
+    def truncate_journal(self, file, size):
+        file.truncate(size)
+        file.flush()
+        os.fsync(file.fileno())
+
+    def set_aside_journal(self, file, applied, reason):
+        # Keeps a copy of the whole journal in .stale for manual recovery and cuts the
+        # journal back to the `applied` bytes, so it matches what was loaded.
+        file.seek(0)
+        write_file_atomic(file.read(), self.journal + ".stale", rotate=False)
+        self.truncate_journal(file, applied)
+        self.warnings.append(f"{self.journal} has {reason}; the changes from there on were not applied. "
+                             f"The whole journal was set aside in {self.journal}.stale.")
+
+    def load(self, lazy=False, stream=False, on_account=None, before_change=None):
+        # stream=True parses data.json account by account (see stream_data); if that
+        # fails, the regular path below falls back through the older generations.
+        # `streamed` tells the caller whether on_account saw the data that was returned.
+        with self.file_lock:
+            data = self.load_locked(lazy, stream, on_account, before_change)
+            self.remember_disk()
+            return data
+
+    def load_locked(self, lazy, stream, on_account, before_change):
+        self.digest = None
+        self.spans = {}
+        self.streamed = False
+        data = self.load_from_index() if lazy else None
+        if data is None and stream and os.path.exists(self.filename):
+            hasher = hashlib.sha1()
+            try:
+                with open(self.filename, "rb") as file:
+                    data = stream_data(file, on_account, hasher=hasher, blobs=self.blobs)
+                self.digest = hasher.hexdigest()
+                self.streamed = True
+            except (OSError, ValueError):
+                data = None
+        if data is None:
+            raw, data = self.read_snapshot()
+            if raw is not None:
+                self.digest = hashlib.sha1(raw).hexdigest()
+        self.replay_journal(data, before_change)
+        return data
+
+    def can_load_lazily(self):
+        return self.read_index() is not None
+
+    # ----- Fast start -----
+    # Every snapshot is written together with data.json.index: the account keys in
+    # order and the byte span of each account in data.json, stamped with the
+    # snapshot's size and mtime. A fast start reads only the index and the small
+    # top-level entries; accounts are parsed from their span when first used.
+    def read_index(self):
+        try:
+            with open(self.index_file, "r") as file:
+                index = json.load(file)
+            stat = os.stat(self.filename)
+        except (OSError, ValueError):
+            return None
+        if [stat.st_size, stat.st_mtime_ns] != index.get("stamp"):
+            return None
+        return index
+
+    def read_span(self, start, end):
+        with open(self.filename, "rb") as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    def load_from_index(self):
+        index = self.read_index()
+        if index is None:
+            return None
+        self.digest = index["digest"]
+        self.spans = {key: tuple(span) for key, *span in index["accounts"]}
+        data = {}
+        for key, start, end in index["entries"]:
+            if key == "accounts":
+                data[key] = LazyAccounts([key for key, *_ in index["accounts"]], self.load_account)
+            else:
+                data[key] = json.loads(self.read_span(start, end))
+                if key == "OTHERS":
+                    compact_account(data[key], self.blobs)
+        return data
+
+    def load_account(self, account_key):
+        # Under the lock so a compaction cannot swap the file between span and read.
+        with self.file_lock:
+            if self.seen is not None and not self.snapshot_unchanged():
+                raise ExternalChange(f"{self.filename} was replaced by another program.")
+            return compact_account(json.loads(self.read_span(*self.spans[account_key])), self.blobs)
+
+    def encode(self, data):
+        # Produces exactly json.dumps(data, indent=4), one account at a time, so the
+        # span of every account can be recorded. Accounts a fast start never loaded
+        # are copied byte for byte from the current snapshot instead of being parsed.
+        with self.lock:
+            return self.encode_locked(data)
+
+    def encode_locked(self, data):
+        parts, entries, spans = [], [], {}
+        position = 0
+        accounts_unloaded = set(data["accounts"].unloaded_keys()) if isinstance(data.get("accounts"), LazyAccounts) else ()
+        if accounts_unloaded and self.seen is not None and not self.snapshot_unchanged():
+            raise ExternalChange(f"{self.filename} was replaced by another program.")
+        def emit(text):
+            nonlocal position
+            parts.append(text)
+            position += len(text)
+        if not data:
+            emit("{}")
+        else:
+            emit("{")
+            for n, (key, value) in enumerate(data.items()):
+                emit(("," if n else "") + "\n    " + json.dumps(key) + ": ")
+                start = position
+                if key == "accounts" and value:
+                    emit("{")
+                    for m, account_key in enumerate(value):
+                        emit(("," if m else "") + "\n        " + json.dumps(account_key) + ": ")
+                        account_start = position
+                        if account_key in accounts_unloaded:
+                            emit(self.read_span(*self.spans[account_key]).decode("ascii"))
+                        else:
+                            emit(json.dumps(value[account_key], indent=4, default=self.blobs.default).replace("\n", "\n        "))
+                        spans[account_key] = (account_start, position)
+                    emit("\n    }")
+                else:
+                    emit(json.dumps(value, indent=4, default=self.blobs.default).replace("\n", "\n    "))
+                entries.append((key, start, position))
+            emit("\n}")
+        self.blobs.snapshot_done()
+        return "".join(parts).encode("ascii"), {"entries": entries, "spans": spans}
+
+    def write_index(self, digest, layout):
+        stat = os.stat(self.filename)
+        index = {"stamp": [stat.st_size, stat.st_mtime_ns], "digest": digest,
+                 "entries": [list(entry) for entry in layout["entries"]],
+                 "accounts": [[key, start, end] for key, (start, end) in layout["spans"].items()]}
+        write_file_atomic(json.dumps(index, separators=(",", ":")).encode("utf-8"), self.index_file, rotate=False)
+        self.spans = dict(layout["spans"])
+
+    def append(self, lines):
+        with self.file_lock:
+            if self.changed_on_disk():
+                raise ExternalChange(f"{self.filename} was changed by another program.")
+            with open(self.journal, "a") as file:
+                if file.tell() == 0:
+                    file.write(json.dumps({"base": self.digest}) + "\n")
+                file.writelines(lines)
+                file.flush()
+                os.fsync(file.fileno())
+                size = file.tell()
+            self.remember_disk()
+            return size > JOURNAL_MAX_BYTES
+
+    def write_snapshot(self, raw, layout=None, force=False):
+        with self.file_lock:
+            if not force and self.changed_on_disk():
+                raise ExternalChange(f"{self.filename} was changed by another program.")
+            referenced = {digest.decode("ascii") for digest in BLOB_REFERENCE.findall(raw)}
+            if referenced:
+                self.blobs.check(referenced)
+            write_file_atomic(raw, self.filename)
+            self.digest = hashlib.sha1(raw).hexdigest()
+            if layout is not None:
+                self.write_index(self.digest, layout)
+            elif os.path.exists(self.index_file):
+                os.remove(self.index_file)
+            # The snapshot now contains every journaled change.
+            if os.path.exists(self.journal):
+                os.remove(self.journal)
+            self.remember_disk()
+            self.blobs.collect(referenced, [generation_file(self.filename, n) for n in range(1, SNAPSHOT_GENERATIONS + 1)])
+
+    def has_journal(self):
+        return os.path.exists(self.journal)
+
+    def save(self, data, force=False):
+        with self.file_lock:
+            self.write_snapshot(*self.encode(data), force=force)
+
+    # ----- Sharing the file -----
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal)
+        except FileNotFoundError:
+            return 0
+
+    def remember_disk(self):
+        self.seen = (file_stamp(self.filename), self.journal_size())
+
+    def snapshot_unchanged(self):
+        # A new stamp on the same bytes (a sync tool touching the file) is not a change.
+        stamp = file_stamp(self.filename)
+        if stamp == self.seen[0]:
+            return True
+        if stamp is None or self.digest is None or file_digest(self.filename) != self.digest:
+            return False
+        self.seen = (stamp, self.seen[1])
+        return True
+
+    def changed_on_disk(self):
+        with self.file_lock:
+            if self.seen is None:
+                return False
+            return not self.snapshot_unchanged() or self.journal_size() != self.seen[1]
+
+    def read_new_changes(self):
+        # What another process appended to the journal since we last looked, or None
+        # when it also rewrote the snapshot.
+        with self.file_lock:
+            if self.seen is None or not self.snapshot_unchanged():
+                return None
+            size, offset = self.journal_size(), self.seen[1]
+            if size < offset:
+                return None
+            changes = []
+            if size > offset:
+                with open(self.journal, "rb") as file:
+                    file.seek(offset)
+                    lines = file.read(size - offset).decode("utf-8").splitlines()
+                try:
+                    if offset == 0 and json.loads(lines.pop(0)).get("base") != self.digest:
+                        return None
+                    changes = [decode_change(line) for line in lines]
+                except (ValueError, IndexError):
+                    return None
+            self.seen = (self.seen[0], size)
+            return changes
+
+    def read_external(self):
+        # A second storage sharing our locks reads everything; adopt() takes over its
+        # digest and disk state once the caller has installed the data.
+        with self.file_lock:
+            other = JsonStorage(self.filename)
+            other.lock, other.file_lock = self.lock, self.file_lock
+            data = other.load()
+            self.warnings.extend(other.warnings)
+            self.external = other
+            return data
+
+    def adopt(self):
+        other, self.external = self.external, None
+        # Every account is loaded after an external read, so no spans are needed.
+        self.digest, self.seen, self.spans = other.digest, other.seen, {}
+
+# Accounts, their phone numbers and their services live in separate tables, so a
+# change touches only the rows involved. Each service row keeps the complete
+# service as JSON in `body` (lossless round trips) next to indexed copies of its
+# name, username, email and url for queries from outside the app. The app itself
+# loads accounts one at a time when first used (LazyAccounts) and searches them
+# with the in-memory ServiceIndex. Top-level keys other than accounts/OTHERS go
+# to `meta`.
+ACCOUNT_COLUMNS = {"sign_in_with": "sign_in_with", "password": "password", "dateCreated": "date_created"}
+SERVICE_COLUMNS = ("name", "username", "email", "url")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    sign_in_with TEXT,
+    password TEXT,
+    date_created TEXT,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phones (
+    account TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    phone TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    username TEXT,
+    email TEXT,
+    url TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS accounts_position ON accounts (position);
+CREATE INDEX IF NOT EXISTS phones_account ON phones (account, position);
+CREATE INDEX IF NOT EXISTS services_account ON services (account, position);
+CREATE INDEX IF NOT EXISTS services_name ON services (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS services_email ON services (email COLLATE NOCASE);
+"""
+
+class SqliteStorage(Storage):
+    def __init__(self, filename):
+        super().__init__(filename)
+        # Loading happens on the Tk thread and appends on the saver thread; the lock
+        # keeps them off the connection at the same time.
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.seen = None           # PRAGMA data_version as of our last read or write.
+        self.external = None
+
+    # ----- Reading -----
+    def account_from_row(self, row, phones, services):
+        _, _, sign_in_with, password, date_created, body = row
+        body = json.loads(body)
+        values = dict(body.get("extra", {}))
+        values.update({"sign_in_with": sign_in_with, "password": password, "dateCreated": date_created,
+                       "services": [Service(service) for service in services]})
+        values.setdefault("phone", phones)
+        return {key: values[key] for key in body["order"]}
+
+    def load(self, lazy=False):
+        if lazy:
+            with self.lock:
+                data = {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+                data["accounts"] = LazyAccounts(self.account_keys(), self.load_account)
+                others = self.load_account("OTHERS")
+                if others is not None:
+                    data["OTHERS"] = others
+                self.seen = self.data_version()
+                return data
+        with self.lock:
+            data = {}
+            for key, value in self.conn.execute("SELECT key, value FROM meta"):
+                data[key] = json.loads(value)
+            phones, services = {}, {}
+            for account, phone in self.conn.execute("SELECT account, phone FROM phones ORDER BY account, position"):
+                phones.setdefault(account, []).append(phone)
+            for account, body in self.conn.execute("SELECT account, body FROM services ORDER BY account, position"):
+                services.setdefault(account, []).append(json.loads(body))
+            accounts = {}
+            others = None
+            for row in self.conn.execute("SELECT * FROM accounts ORDER BY position"):
+                account = self.account_from_row(row, phones.get(row[0], []), services.get(row[0], []))
+                if row[0] == "OTHERS":
+                    others = account
+                else:
+                    accounts[row[0]] = account
+            data["accounts"] = accounts
+            if others is not None:
+                data["OTHERS"] = others
+            self.seen = self.data_version()
+            return data
+
+    def account_keys(self):
+        with self.lock:
+            return [key for key, in self.conn.execute("SELECT key FROM accounts WHERE key != 'OTHERS' ORDER BY position")]
+
+    def load_account(self, account_key):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM accounts WHERE key = ?", (account_key,)).fetchone()
+            if row is None:
+                return None
+            phones = [phone for phone, in self.conn.execute(
+                "SELECT phone FROM phones WHERE account = ? ORDER BY position", (account_key,))]
+            return self.account_from_row(row, phones, self.service_page(account_key))
+
+    def service_page(self, account_key, offset=0, limit=-1):
+        with self.lock:
+            return [json.loads(body) for body, in self.conn.execute(
+                "SELECT body FROM services WHERE account = ? ORDER BY position LIMIT ? OFFSET ?",
+                (account_key, limit, offset))]
+
+    def count_services(self, account_key):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM services WHERE account = ?", (account_key,)).fetchone()[0]
+
+    # ----- Writing -----
+    def next_position(self):
+        return self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM accounts").fetchone()[0]
+
+    def write_account(self, account_key, account, position):
+        extra = {key: value for key, value in account.items()
+                 if key not in ACCOUNT_COLUMNS and key != "services" and not (key == "phone" and isinstance(value, list))}
+        body = {"order": list(account), "extra": extra}
+        self.conn.execute("DELETE FROM accounts WHERE key = ?", (account_key,))
+        self.conn.execute("INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?)",
+                          (account_key, position, account.get("sign_in_with"), account.get("password"),
+                           account.get("dateCreated"), json.dumps(body, default=json_default)))
+        self.conn.execute("DELETE FROM phones WHERE account = ?", (account_key,))
+        if isinstance(account.get("phone"), list):
+            self.conn.executemany("INSERT INTO phones VALUES (?, ?, ?)",
+                                  [(account_key, i, phone) for i, phone in enumerate(account["phone"])])
+
+    def write_service(self, account_key, position, service):
+        self.conn.execute("INSERT INTO services (account, position, name, username, email, url, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (account_key, position, *(str(service.get(column, "")) for column in SERVICE_COLUMNS),
+                           json.dumps(service, default=json_default)))
+
+    def put_account(self, account_key, account, position=None):
+        if position is None:
+            row = self.conn.execute("SELECT position FROM accounts WHERE key = ?", (account_key,)).fetchone()
+            position = row[0] if row else self.next_position()
+        self.write_account(account_key, account, position)
+        self.conn.execute("DELETE FROM services WHERE account = ?", (account_key,))
+        for i, service in enumerate(account.get("services", [])):
+            self.write_service(account_key, i, service)
+
+    def read_account_fields(self, account_key):
+        row = self.conn.execute("SELECT * FROM accounts WHERE key = ?", (account_key,)).fetchone()
+        if row is None:
+            return None, {}
+        phones = [phone for phone, in self.conn.execute(
+            "SELECT phone FROM phones WHERE account = ? ORDER BY position", (account_key,))]
+        return row[1], self.account_from_row(row, phones, [])
+
+    def apply_change(self, change):
+        op = change["op"]
+        account_key = change.get("account")
+        if op == "put_account":
+            self.put_account(account_key, change["value"], None if account_key != "OTHERS" else -1)
+        elif op == "update_account":
+            position, account = self.read_account_fields(account_key)
+            if position is None:
+                position = -1 if account_key == "OTHERS" else self.next_position()
+            account.update(change["fields"])
+            self.write_account(account_key, account, position)
+        elif op == "rename_account":
+            # Like dict.pop + assignment, a renamed account moves to the end.
+            new_key = change["new"]
+            self.conn.execute("UPDATE accounts SET key = ?, position = ? WHERE key = ?",
+                              (new_key, self.next_position(), account_key))
+            self.conn.execute("UPDATE phones SET account = ? WHERE account = ?", (new_key, account_key))
+            self.conn.execute("UPDATE services SET account = ? WHERE account = ?", (new_key, account_key))
+        elif op == "delete_account":
+            for table, column in (("accounts", "key"), ("phones", "account"), ("services", "account")):
+                self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (account_key,))
+        elif op == "add_service":
+            if account_key == "OTHERS" and self.read_account_fields("OTHERS")[0] is None:
+                self.write_account("OTHERS", {"services": []}, -1)
+            if "index" in change:
+                self.conn.execute("UPDATE services SET position = position + 1 WHERE account = ? AND position >= ?",
+                                  (account_key, change["index"]))
+            self.write_service(account_key, change.get("index", self.count_services(account_key)), change["value"])
+        elif op == "set_service":
+            service = change["value"]
+            self.conn.execute("UPDATE services SET name = ?, username = ?, email = ?, url = ?, body = ? WHERE account = ? AND position = ?",
+                              (*(str(service.get(column, "")) for column in SERVICE_COLUMNS), json.dumps(service, default=json_default),
+                               account_key, change["index"]))
+        elif op == "delete_service":
+            self.conn.execute("DELETE FROM services WHERE account = ? AND position = ?", (account_key, change["index"]))
+            self.conn.execute("UPDATE services SET position = position - 1 WHERE account = ? AND position > ?",
+                              (account_key, change["index"]))
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def append(self, lines):
+        with self.lock:
+            with self.conn:
+                version = self.begin_write()
+                for line in lines:
+                    self.apply_change(json.loads(line))
+            self.seen = version
+        return False
+
+    def save(self, data, force=False):
+        # Materialize lazily loaded accounts before their rows are cleared.
+        accounts = list(data.get("accounts", {}).items())
+        with self.lock:
+            with self.conn:
+                version = self.begin_write(force)
+                for table in ("meta", "accounts", "phones", "services"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                for key, value in data.items():
+                    if key not in ("accounts", "OTHERS"):
+                        self.conn.execute("INSERT INTO meta VALUES (?, ?)", (key, json.dumps(value, default=json_default)))
+                for position, (account_key, account) in enumerate(accounts):
+                    self.put_account(account_key, account, position)
+                if "OTHERS" in data:
+                    self.put_account("OTHERS", data["OTHERS"], -1)
+            self.seen = version
+
+    # ----- Sharing the file -----
+    # data_version changes whenever another connection commits, so comparing it
+    # inside a write transaction is both the check and the lock. Our own commits
+    # leave it alone: once one succeeds, the version read in its transaction
+    # (after a forced write too) is the state we have seen.
+    def data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def begin_write(self, force=False):
+        self.conn.execute("BEGIN IMMEDIATE")
+        version = self.data_version()
+        if not force and self.seen is not None and version != self.seen:
+            raise ExternalChange(f"{self.filename} was changed by another program.")
+        return version
+
+    def changed_on_disk(self):
+        with self.lock:
+            return self.seen is not None and self.data_version() != self.seen
+
+    def read_external(self):
+        with self.lock:
+            seen = self.seen
+            self.conn.execute("BEGIN")
+            try:
+                data = self.load()
+            finally:
+                self.conn.commit()
+            self.external, self.seen = self.seen, seen
+            return data
+
+    def adopt(self):
+        self.seen = self.external
+
+    def checkpoint(self):
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+def open_storage(filename):
+    if filename.lower().endswith(SQLITE_SUFFIXES):
+        return SqliteStorage(filename)
+    return JsonStorage(filename)
+
+# ---------------- Migration ----------------
+def migrate(source, target):
+    # One-shot copy between backends, e.g. data.json (plus its journal) -> data.sqlite3.
+    data = open_storage(source).load()
+    destination = open_storage(target)
+    try:
+        destination.save(data)
+    finally:
+        destination.close()
+    return data
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "migrate":
+        migrated = migrate(sys.argv[2], sys.argv[3])
+        total = sum(len(account.get("services", [])) for _, account in iter_accounts(migrated))
+        print(f"Migrated {len(migrated.get('accounts', {}))} accounts and {total} services to {sys.argv[3]}.")
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "memory":
+        count, sizes = service_memory(sys.argv[2] if len(sys.argv) == 3 else None)
+        for label, size in sizes.items():
+            print(f"{label:8} {size / 1024 / 1024:8.1f} MiB  {size / max(count, 1):6.0f} bytes/service  ({count} services)")
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == "crypto":
+        try:
+            timings = crypto_benchmark(int(sys.argv[2]) if len(sys.argv) == 3 else 10000)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        for label, value in timings.items():
+            print(f"{label:36} {value:10.2f}")
+    else:
+        sys.exit("usage: python storage.py migrate data.json data.sqlite3\n"
+                 "       python storage.py memory [data.json]\n"
+                 "       python storage.py crypto [fields]")
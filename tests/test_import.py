@@ -0,0 +1,12 @@
+from core import Vault
+
+
+def test_padded_default_account_is_created_once(tmp_path):
+    path = str(tmp_path / "data.json")
+    source = tmp_path / "rows.csv"
+    source.write_text("name,username\nMail,me\nShop,me\n", encoding="utf-8")
+    with Vault(path) as vault:
+        stats = vault.import_file(str(source), default_account=" b@x.com ")
+    assert stats["added"] == 2
+    with Vault(path) as vault:
+        assert [service["name"] for service in vault.account("b@x.com")["services"]] == ["Mail", "Shop"]
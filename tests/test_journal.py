@@ -0,0 +1,68 @@
+import os
+from core import Vault
+
+
+def make_vault(tmp_path):
+    path = str(tmp_path / "data.json")
+    with Vault(path) as vault:
+        vault.new_account("a@x.com")
+        vault.add_service("a@x.com", {"name": "Mail"})
+        vault.commit(compact=True)
+    return path
+
+
+def test_append_after_torn_tail_is_replayed(tmp_path):
+    path = make_vault(tmp_path)
+    with Vault(path) as vault:
+        vault.update_service("a@x.com", 0, note="first")
+        vault.commit()
+    with open(path + ".journal", "a") as file:
+        file.write('{"op":"set_service","account":"a@')
+    with Vault(path) as vault:
+        assert vault.account("a@x.com")["services"][0]["note"] == "first"
+        vault.update_service("a@x.com", 0, note="second")
+        vault.commit()
+    with Vault(path) as vault:
+        assert vault.account("a@x.com")["services"][0]["note"] == "second"
+    with open(path + ".journal", "rb") as file:
+        assert file.read().endswith(b"\n")
+
+
+def test_journal_for_another_snapshot_is_set_aside_with_a_warning(tmp_path):
+    path = make_vault(tmp_path)
+    with open(path + ".journal", "w") as file:
+        file.write('{"base": "0000"}\n{"op":"delete_account","account":"a@x.com"}\n')
+    with Vault(path) as vault:
+        assert vault.has_account("a@x.com")
+        assert any(".journal.stale" in warning for warning in vault.storage.warnings)
+    assert os.path.exists(path + ".journal.stale")
+
+
+def test_bad_line_in_the_middle_sets_the_journal_aside(tmp_path):
+    path = make_vault(tmp_path)
+    with Vault(path) as vault:
+        vault.update_service("a@x.com", 0, note="first")
+        vault.commit()
+    with open(path + ".journal", "a") as file:
+        file.write('{"op":"set_service","account":"a@x.com","ind\n')
+        file.write('{"op":"delete_account","account":"a@x.com"}\n')
+    with Vault(path) as vault:
+        assert vault.account("a@x.com")["services"][0]["note"] == "first"
+        assert any(".journal.stale" in warning for warning in vault.storage.warnings)
+    with open(path + ".journal.stale") as file:
+        assert "delete_account" in file.read()
+    with Vault(path) as vault:
+        assert vault.account("a@x.com")["services"][0]["note"] == "first"
+
+
+def test_change_that_cannot_be_applied_sets_the_journal_aside(tmp_path):
+    path = make_vault(tmp_path)
+    with Vault(path) as vault:
+        vault.update_service("a@x.com", 0, note="first")
+        vault.commit()
+    with open(path + ".journal", "a") as file:
+        file.write('{"op":"delete_service","account":"a@x.com","index":5}\n')
+    with Vault(path) as vault:
+        assert vault.account("a@x.com")["services"][0]["note"] == "first"
+        assert any("cannot be applied" in warning for warning in vault.storage.warnings)
+    assert os.path.exists(path + ".journal.stale")
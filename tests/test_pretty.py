@@ -0,0 +1,42 @@
+import random
+from core import pretty_print
+
+
+def baseline_pretty_print(data, indent=0):
+    # pretty_print as it was before it streamed its lines.
+    spacing = "  " * indent
+    result = ""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                result += f"{spacing}{key}:\n{baseline_pretty_print(value, indent+1)}"
+            else:
+                result += f"{spacing}{key}: {value}\n"
+    elif isinstance(data, list):
+        for item in data:
+            result += f"{spacing}- {baseline_pretty_print(item, indent+1).strip()}\n"
+    else:
+        result += f"{spacing}{data}\n"
+    return result
+
+
+SCALARS = ["x", " padded ", "", "  ", "two\nlines", "\n lead", "trail \n", 0, 1.5, None, True]
+
+
+def random_value(rng, depth):
+    roll = rng.random()
+    if depth <= 0 or roll < 0.4:
+        return rng.choice(SCALARS)
+    if roll < 0.7:
+        return [random_value(rng, depth - 1) for _ in range(rng.randrange(4))]
+    return {rng.choice([f"k{n}", f" k{n}", f"k{n} "]): random_value(rng, depth - 1) for n in range(rng.randrange(4))}
+
+
+def test_matches_baseline_layout():
+    examples = [{"a": 1, "b": [1, {"c": 2, "d": [3, []]}, [], {}]}, [[1, 2], [[3]], " x ", [" y "], {" k": " v "}],
+                "plain", [], {}, [{"a": {"b": "  "}}], [["", "  "], "\n\n"]]
+    rng = random.Random(7)
+    examples += [random_value(rng, 5) for _ in range(2000)]
+    for value in examples:
+        for indent in (0, 2):
+            assert pretty_print(value, indent) == baseline_pretty_print(value, indent), value
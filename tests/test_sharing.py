@@ -0,0 +1,23 @@
+from core import Vault
+
+
+def test_sqlite_writes_after_merge_need_no_second_merge(tmp_path, monkeypatch):
+    path = str(tmp_path / "vault.db")
+    with Vault(path) as vault:
+        vault.new_account("a@x.com")
+    first, second = Vault(path), Vault(path)
+    first.update_account("a@x.com", note="one")
+    first.commit()
+    second.new_account("b@x.com")
+    second.commit()                # Merges with what `first` wrote.
+    assert not second.storage.changed_on_disk()
+    merges = []
+    monkeypatch.setattr(second, "merge_external", lambda: merges.append(1))
+    second.new_account("c@x.com")
+    second.commit()
+    assert merges == []
+    first.close()
+    second.close()
+    with Vault(path) as vault:
+        assert vault.keys()[:3] == ["a@x.com", "b@x.com", "c@x.com"]
+        assert vault.account("a@x.com")["note"] == "one"